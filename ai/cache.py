@@ -0,0 +1,73 @@
+import os
+import json
+import sqlite3
+import hashlib
+from typing import Optional
+
+from api.database import DatabaseManager
+
+def enhancement_key(summary: str, model_name: str, system_prompt: str, template: str, language: str) -> str:
+    """AI增强结果的内容寻址键：输入的任一部分变化都会得到不同的键。"""
+    payload = json.dumps([summary, model_name, system_prompt, template, language], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class EnhancementCache:
+    """持久化的AI增强结果缓存。
+
+    配置了 DATABASE_URL 时存放在数据库的 enhancement_cache 表中，
+    否则使用本地 SQLite 文件（ENHANCE_CACHE_PATH）。
+    """
+    def __init__(self, db_manager: Optional[DatabaseManager] = None, path: Optional[str] = None):
+        self.db_manager = db_manager or DatabaseManager()
+        self.path = None
+        if not self.db_manager.conn_string:
+            self.path = path or os.environ.get(
+                'ENHANCE_CACHE_PATH', os.path.join(os.environ.get('DATA_DIR', 'data'), 'enhance_cache.sqlite3'))
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+
+    def _sqlite(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE IF NOT EXISTS enhancement_cache (key TEXT PRIMARY KEY, model TEXT, result TEXT NOT NULL)")
+        return conn
+
+    def get_many(self, keys: list) -> dict:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        if self.path is None:
+            found = self.db_manager.get_enhancement_cache(keys)
+        else:
+            found = {}
+            with self._sqlite() as conn:
+                # 分批查询，避免超出 SQLite 的参数个数限制
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    rows = conn.execute(
+                        f"SELECT key, result FROM enhancement_cache WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk).fetchall()
+                    found.update({key: json.loads(result) for key, result in rows})
+            conn.close()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries: dict, model: str):
+        if not entries:
+            return
+        if self.path is None:
+            self.stored += self.db_manager.put_enhancement_cache(entries, model)
+            return
+        with self._sqlite() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO enhancement_cache (key, model, result) VALUES (?, ?, ?)",
+                [(key, model, json.dumps(result, ensure_ascii=False)) for key, result in entries.items()])
+        conn.close()
+        self.stored += len(entries)
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"缓存命中 {self.hits} 篇，未命中 {self.misses} 篇（命中率 {rate:.1f}%），新写入 {self.stored} 篇"
@@ -0,0 +1,341 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+from typing import Optional
+
+import openai
+
+from ai.structure import Structure
+
+# 并发度会在 [MIN, MAX] 之间根据 429 和延迟自适应调整
+ENHANCE_MIN_CONCURRENCY = int(os.environ.get("ENHANCE_MIN_CONCURRENCY", "2"))
+ENHANCE_MAX_CONCURRENCY = int(os.environ.get("ENHANCE_MAX_CONCURRENCY", "50"))
+ENHANCE_INITIAL_CONCURRENCY = int(os.environ.get("ENHANCE_INITIAL_CONCURRENCY", "8"))
+# 单次请求延迟超过该值（秒）时视为服务端过载，收缩并发
+ENHANCE_TARGET_LATENCY = float(os.environ.get("ENHANCE_TARGET_LATENCY", "30"))
+# 每分钟请求数和 token 数预算，0 表示不限制
+ENHANCE_RPM = float(os.environ.get("ENHANCE_RPM", "0"))
+ENHANCE_TPM = float(os.environ.get("ENHANCE_TPM", "0"))
+# 单次请求超时（秒）和每篇论文的最大尝试次数
+ENHANCE_TIMEOUT = float(os.environ.get("ENHANCE_TIMEOUT", "120"))
+ENHANCE_MAX_ATTEMPTS = int(os.environ.get("ENHANCE_MAX_ATTEMPTS", "6"))
+# 重试退避的基数和上限（秒）
+ENHANCE_BACKOFF_BASE = float(os.environ.get("ENHANCE_BACKOFF_BASE", "1"))
+ENHANCE_BACKOFF_MAX = float(os.environ.get("ENHANCE_BACKOFF_MAX", "60"))
+# 预估的每篇论文输出 token 数，请求完成后按实际用量校正
+ENHANCE_EXPECTED_OUTPUT_TOKENS = int(os.environ.get("ENHANCE_EXPECTED_OUTPUT_TOKENS", "600"))
+# 批量模式：每个请求最多打包的论文数，以及单个请求的预估 token 上限（输入+输出）
+ENHANCE_BATCH_SIZE = int(os.environ.get("ENHANCE_BATCH_SIZE", "10"))
+ENHANCE_BATCH_TOKENS = int(os.environ.get("ENHANCE_BATCH_TOKENS", "8000"))
+
+def estimate_tokens(text: str) -> int:
+    # 粗略估算：英文约 4 字符 1 token，中文约 1 字 1 token，取偏保守的值
+    return len(text) // 3 + 1
+
+def parse_json_content(content: str) -> str:
+    # 移除Markdown代码块标记
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.split("\n", 1)[1] if "\n" in content else ""
+        if content.endswith("```"):
+            content = content[:-3]
+    return content
+
+def make_batches(data: list, max_items: int = ENHANCE_BATCH_SIZE, max_tokens: int = ENHANCE_BATCH_TOKENS) -> list:
+    """按预估 token 数把论文装箱，每批的输入与预期输出之和不超过 max_tokens。"""
+    batches, current, current_tokens = [], [], 0
+    for d in data:
+        tokens = estimate_tokens(d.get('summary') or '') + ENHANCE_EXPECTED_OUTPUT_TOKENS
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(d)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+class AdaptiveLimiter:
+    """AIMD 并发控制：成功且延迟正常时缓慢加大并发，遇到 429 或高延迟时成倍收缩。"""
+    def __init__(self, initial: int = ENHANCE_INITIAL_CONCURRENCY, minimum: int = ENHANCE_MIN_CONCURRENCY,
+                 maximum: int = ENHANCE_MAX_CONCURRENCY, target_latency: float = ENHANCE_TARGET_LATENCY):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+        self._last_decrease = 0.0
+
+    async def acquire(self):
+        async with self._condition:
+            while self.in_flight >= int(self.limit):
+                await self._condition.wait()
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def on_success(self, latency: float):
+        async with self._condition:
+            if latency > self.target_latency:
+                self._decrease(0.9)
+            else:
+                # 每完成约一个窗口的请求并发 +1
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    async def on_overload(self):
+        async with self._condition:
+            self._decrease(0.5)
+
+    def _decrease(self, factor: float):
+        # 同一批在途请求触发的多次 429 只收缩一次
+        now = time.monotonic()
+        if now - self._last_decrease < 1.0:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.minimum), self.limit * factor)
+
+class RateBudget:
+    """按分钟计的请求数和 token 数令牌桶，额度不足时等待。"""
+    def __init__(self, rpm: float = ENHANCE_RPM, tpm: float = ENHANCE_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = rpm
+        self._tokens = tpm
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int):
+        if not self.rpm and not self.tpm:
+            return
+        # 单个请求超过整桶容量时按整桶计，避免永远等待
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+        async with self._lock:
+            while True:
+                self._refill()
+                wait = 0.0
+                if self.rpm and self._requests < 1:
+                    wait = max(wait, (1 - self._requests) * 60 / self.rpm)
+                if self.tpm and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self.rpm:
+                self._requests -= 1
+            if self.tpm:
+                self._tokens -= tokens
+
+    def adjust(self, delta_tokens: int):
+        # 按实际用量校正预估的 token 消耗
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens - delta_tokens)
+
+class EnhancementStats:
+    def __init__(self):
+        self.requests = 0
+        self.batch_fallbacks = 0
+        self.succeeded = 0
+        self.failed = {}  # 论文 id -> 最后一次的错误信息
+        self.retries = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.started = time.monotonic()
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.succeeded / elapsed * 60 if elapsed > 0 else 0.0
+        return (f"成功 {self.succeeded} 篇，失败 {len(self.failed)} 篇，请求 {self.requests} 次，"
+                f"批量回退 {self.batch_fallbacks} 篇，重试 {self.retries} 次"
+                f"（429: {self.rate_limited}，超时: {self.timeouts}），"
+                f"token {self.prompt_tokens}+{self.completion_tokens}，"
+                f"耗时 {elapsed:.1f}s，{rate:.1f} 篇/分钟")
+
+class RetryableError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None, overload: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.overload = overload
+
+class EnhancementEngine:
+    """基于 AsyncOpenAI 的增强引擎：自适应并发、预算限流、带抖动的指数退避重试和单次请求超时。"""
+    def __init__(self, client, model_name: str, messages_template: list, language: str,
+                 limiter: Optional[AdaptiveLimiter] = None, budget: Optional[RateBudget] = None,
+                 timeout: float = ENHANCE_TIMEOUT, max_attempts: int = ENHANCE_MAX_ATTEMPTS,
+                 batch_template: Optional[list] = None):
+        self.client = client
+        self.model_name = model_name
+        self.messages_template = messages_template
+        # 提供批量提示词模板时启用批量模式
+        self.batch_template = batch_template
+        self.language = language
+        self.limiter = limiter
+        self.budget = budget
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.stats = EnhancementStats()
+
+    def build_messages(self, d: dict) -> list:
+        # 格式化用户内容
+        user_content = self.messages_template[1]["content"].format(language=self.language, content=d['summary'])
+        return [
+            self.messages_template[0],
+            {"role": "user", "content": user_content}
+        ]
+
+    def build_batch_messages(self, batch: list) -> list:
+        content = '\n\n'.join(f"[id: {d['id']}]\n{d.get('summary') or ''}" for d in batch)
+        return [
+            self.batch_template[0],
+            {"role": "user", "content": self.batch_template[1]["content"].format(language=self.language, content=content)}
+        ]
+
+    async def complete(self, messages: list, papers: int = 1) -> str:
+        """发送一次请求（含限流、超时和重试），返回模型输出的文本。"""
+        estimated = sum(estimate_tokens(m["content"]) for m in messages) + ENHANCE_EXPECTED_OUTPUT_TOKENS * papers
+        attempt = 0
+        while True:
+            attempt += 1
+            self.stats.requests += 1
+            await self.budget.acquire(estimated)
+            await self.limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(
+                        model=self.model_name,
+                        messages=messages,
+                        response_format={"type": "json_object"}  # 明确请求JSON输出
+                    ),
+                    timeout=self.timeout,
+                )
+                await self.limiter.on_success(time.monotonic() - started)
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    self.stats.prompt_tokens += usage.prompt_tokens or 0
+                    self.stats.completion_tokens += usage.completion_tokens or 0
+                    self.budget.adjust((usage.total_tokens or 0) - estimated)
+                return response.choices[0].message.content or ""
+            except Exception as e:
+                error = self._classify(e)
+                if error is None:
+                    raise
+                if error.overload:
+                    await self.limiter.on_overload()
+            finally:
+                await self.limiter.release()
+            if attempt >= self.max_attempts:
+                raise error
+            self.stats.retries += 1
+            await asyncio.sleep(self._backoff(attempt, error.retry_after))
+
+    def _classify(self, e: Exception) -> Optional[RetryableError]:
+        """把可重试的异常转换为 RetryableError，其他异常返回 None。"""
+        if isinstance(e, openai.RateLimitError):
+            self.stats.rate_limited += 1
+            return RetryableError(str(e), self._retry_after(e), overload=True)
+        if isinstance(e, (asyncio.TimeoutError, openai.APITimeoutError)):
+            self.stats.timeouts += 1
+            return RetryableError("请求超时", overload=True)
+        if isinstance(e, openai.APIConnectionError):
+            return RetryableError(str(e))
+        if isinstance(e, openai.APIStatusError) and e.status_code >= 500:
+            return RetryableError(str(e), self._retry_after(e), overload=e.status_code in (502, 503, 504))
+        return None
+
+    @staticmethod
+    def _retry_after(e) -> Optional[float]:
+        response = getattr(e, "response", None)
+        value = response.headers.get("retry-after") if response is not None else None
+        try:
+            return float(value) if value else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[float]) -> float:
+        # 全抖动指数退避；服务端给出 Retry-After 时不早于该时间
+        delay = random.uniform(0, min(ENHANCE_BACKOFF_MAX, ENHANCE_BACKOFF_BASE * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    async def enhance_item(self, d: dict) -> dict:
+        messages = self.build_messages(d)
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                content = await self.complete(messages)
+                # 手动解析响应为Structure对象
+                d['AI'] = Structure.model_validate_json(parse_json_content(content)).model_dump()
+                self.stats.succeeded += 1
+                return d
+            except Exception as e:
+                # 模型输出不合法时重新请求，请求本身的重试已在 complete 中完成
+                if isinstance(e, ValueError) and attempt < self.max_attempts:
+                    self.stats.retries += 1
+                    continue
+                print(f"{d['id']} has an error: {e}", file=sys.stderr)
+                self.stats.failed[d['id']] = str(e)
+                return d
+        return d
+
+    @staticmethod
+    def parse_batch(content: str) -> dict:
+        """解析批量输出，返回 {论文id: 原始对象}；整体不是合法JSON时抛出 ValueError。"""
+        parsed = json.loads(parse_json_content(content))
+        elements = parsed.get("papers") if isinstance(parsed, dict) else parsed
+        if not isinstance(elements, list):
+            raise ValueError("批量输出中缺少 papers 数组")
+        return {str(e.get("id")): e for e in elements if isinstance(e, dict) and e.get("id") is not None}
+
+    async def enhance_batch(self, batch: list) -> list:
+        if len(batch) == 1:
+            return [await self.enhance_item(batch[0])]
+        try:
+            content = await self.complete(self.build_batch_messages(batch), papers=len(batch))
+            elements = self.parse_batch(content)
+        except Exception as e:
+            print(f"批量请求失败，{len(batch)} 篇改为逐篇处理: {e}", file=sys.stderr)
+            elements = {}
+        # 每个元素单独校验，只有缺失或不合法的论文才回退到单篇请求
+        fallback = []
+        for d in batch:
+            element = elements.get(str(d['id']))
+            try:
+                if element is None:
+                    raise ValueError("批量输出中缺少该论文")
+                element = {k: v for k, v in element.items() if k != "id"}
+                d['AI'] = Structure.model_validate(element).model_dump()
+                self.stats.succeeded += 1
+            except ValueError:
+                fallback.append(d)
+        self.stats.batch_fallbacks += len(fallback)
+        if fallback:
+            await asyncio.gather(*(self.enhance_item(d) for d in fallback))
+        return batch
+
+    async def run(self, data: list) -> list:
+        if self.limiter is None:
+            self.limiter = AdaptiveLimiter()
+        if self.budget is None:
+            self.budget = RateBudget()
+        if self.batch_template is not None:
+            await asyncio.gather(*(self.enhance_batch(b) for b in make_batches(data)))
+            return data
+        return list(await asyncio.gather(*(self.enhance_item(d) for d in data)))
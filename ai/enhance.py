@@ -1,55 +1,53 @@
 import os
 import json
 import sys
+import asyncio
+import threading
 
 import dotenv
 import argparse
 
 import openai
 
-from ai.structure import Structure
-from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from ai.cache import EnhancementCache, enhancement_key
+from ai.engine import ENHANCE_TIMEOUT, AdaptiveLimiter, EnhancementEngine, RateBudget
 
 if os.path.exists('.env'):
     dotenv.load_dotenv()
 
+# 进程内所有增强调用共用一个事件循环、一个并发控制器和一个速率预算：
+# 多个流水线线程、后台队列线程同时增强时，RPM/TPM 配额是整个进程的总量，AIMD 状态也会一直延续
+_loop = None
+_loop_lock = threading.Lock()
+_limiter = None
+_budget = None
+
+def _shared_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _limiter, _budget
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="enhance-loop", daemon=True).start()
+            _limiter = AdaptiveLimiter()
+            _budget = RateBudget()
+        return _loop
+
+def shared_rate_control() -> tuple:
+    """返回进程共用的 (AdaptiveLimiter, RateBudget)，它们只能在 _shared_loop 中使用。"""
+    _shared_loop()
+    return _limiter, _budget
+
 def parse_args():
     """解析命令行参数"""
     parser = argparse.ArgumentParser()
     parser.add_argument("--data", type=str, required=True, help="jsonline data file")
     return parser.parse_args()
 
-def _enhance_single_item(d, llm_client, messages_template, language, model_name):
-    # 格式化用户内容
-    user_content = messages_template[1]["content"].format(language=language, content=d['summary'])
-    messages = [
-        messages_template[0],
-        {"role": "user", "content": user_content}
-    ]
-    try:
-        response = llm_client.chat.completions.create(
-            model=model_name,
-            messages=messages,
-            response_format={"type": "json_object"} # 明确请求JSON输出
-        )
-        # 手动解析响应为Structure对象
-        response_content = response.choices[0].message.content
-        # 移除Markdown代码块标记
-        if response_content.startswith("```json") and response_content.endswith("```"):
-            response_content = response_content[len("```json\n"):-len("```")]
-        
-        parsed_response = Structure.model_validate_json(response_content)
-        d['AI'] = parsed_response.model_dump()
-    except Exception as e: #
-        print(f"{d['id']} has an error: {e}", file=sys.stderr)
-    return d
-
-def run_enhancement_process(data: list):
-    model_name = os.environ.get("MODEL_NAME", 'deepseek-r1')
-    language = os.environ.get("language", 'Chinese')
+def load_messages_template(language: str, system_file: str = "system.txt", template_file: str = "template.txt") -> list:
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    template_path = os.path.join(current_dir, "template.txt")
-    system_path = os.path.join(current_dir, "system.txt")
+    template_path = os.path.join(current_dir, template_file)
+    system_path = os.path.join(current_dir, system_file)
 
     try:
         template_content = open(template_path, "r").read()
@@ -58,18 +56,71 @@ def run_enhancement_process(data: list):
         print(f"无法读取AI模板或系统文件: {e}", file=sys.stderr)
         raise
 
-    llm_client = openai.OpenAI() 
-    print('Connect to:', model_name, file=sys.stderr)
-    
     # 构建消息列表
     # 格式化系统内容
     formatted_system_content = system_content.format(language=language)
-    messages_template = [
+    return [
         {"role": "system", "content": formatted_system_content},
         {"role": "user", "content": template_content}
     ]
 
-    # 使用ThreadPoolExecutor并行处理
-    with ThreadPoolExecutor(max_workers=50) as executor: # 可以调整max_workers
-        enhanced_data = list(executor.map(lambda d: _enhance_single_item(d, llm_client, messages_template, language, model_name), data))
-    return enhanced_data
+async def enhance_async(data: list, model_name: str, language: str, cache: Optional[EnhancementCache] = None,
+                        errors: Optional[dict] = None, limiter: Optional[AdaptiveLimiter] = None,
+                        budget: Optional[RateBudget] = None) -> list:
+    messages_template = load_messages_template(language)
+    # 先查内容寻址缓存，只有未命中的论文才调用模型
+    keys = {id(d): enhancement_key(d.get('summary') or '', model_name, messages_template[0]["content"],
+                                   messages_template[1]["content"], language) for d in data}
+    cached = cache.get_many(list(keys.values())) if cache is not None else {}
+    pending = []
+    for d in data:
+        result = cached.get(keys[id(d)])
+        if result is not None:
+            d['AI'] = result
+        else:
+            pending.append(d)
+
+    if pending:
+        # 重试由引擎统一处理，关闭 SDK 自带的重试
+        llm_client = openai.AsyncOpenAI(max_retries=0, timeout=ENHANCE_TIMEOUT)
+        print('Connect to:', model_name, file=sys.stderr)
+        # ENHANCE_BATCH=1 时把多篇摘要打包进一个请求
+        batch_template = None
+        if os.environ.get("ENHANCE_BATCH", "0") == "1":
+            batch_template = load_messages_template(language, "batch_system.txt", "batch_template.txt")
+        engine = EnhancementEngine(llm_client, model_name, messages_template, language,
+                                   limiter=limiter, budget=budget, batch_template=batch_template)
+        try:
+            await engine.run(pending)
+        finally:
+            await llm_client.close()
+        print(f"AI增强完成：{engine.stats.summary()}", file=sys.stderr)
+        if errors is not None:
+            errors.update(engine.stats.failed)
+        if cache is not None:
+            failed = set(engine.stats.failed)
+            cache.put_many({keys[id(d)]: d['AI'] for d in pending if d['id'] not in failed and d.get('AI')}, model_name)
+    if cache is not None:
+        print(f"AI增强{cache.summary()}", file=sys.stderr)
+    return data
+
+def run_sync(coro):
+    """在进程共用的事件循环中运行协程并等待结果，可以从任意线程（包括已有事件循环的线程）调用。"""
+    loop = _shared_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("不能在增强事件循环内同步等待增强结果")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+def run_enhancement_process(data: list, use_cache: bool = True, errors: Optional[dict] = None):
+    """对论文列表做AI增强，结果写入各条目的 AI 字段；传入 errors 时会填入 {论文id: 错误信息}。"""
+    model_name = os.environ.get("MODEL_NAME", 'deepseek-r1')
+    language = os.environ.get("language", 'Chinese')
+    if not data:
+        return data
+    cache = EnhancementCache() if use_cache and os.environ.get("ENHANCE_CACHE", "1") != "0" else None
+    limiter, budget = shared_rate_control()
+    return run_sync(enhance_async(data, model_name, language, cache, errors, limiter=limiter, budget=budget))
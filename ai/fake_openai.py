@@ -0,0 +1,97 @@
+"""本地模拟的 OpenAI 兼容服务，用于在不消耗额度的情况下测试AI增强流程。
+
+用法::
+
+    uvicorn ai.fake_openai:app --port 8001
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=fake python -m scheduler.index
+
+通过环境变量模拟服务端行为：
+    FAKE_OPENAI_LATENCY          每次请求的平均延迟（秒）
+    FAKE_OPENAI_MAX_CONCURRENCY  同时处理的请求上限，超出时返回 429
+    FAKE_OPENAI_ERROR_RATE       随机返回 500 的比例
+    FAKE_OPENAI_BATCH_DROP_RATE  批量请求中随机漏掉某篇论文的比例
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import re
+import hashlib
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FAKE_OPENAI_LATENCY = float(os.environ.get("FAKE_OPENAI_LATENCY", "0.2"))
+FAKE_OPENAI_MAX_CONCURRENCY = int(os.environ.get("FAKE_OPENAI_MAX_CONCURRENCY", "16"))
+FAKE_OPENAI_ERROR_RATE = float(os.environ.get("FAKE_OPENAI_ERROR_RATE", "0"))
+FAKE_OPENAI_BATCH_DROP_RATE = float(os.environ.get("FAKE_OPENAI_BATCH_DROP_RATE", "0"))
+
+app = FastAPI(title="Fake OpenAI")
+state = {"in_flight": 0, "requests": 0, "rate_limited": 0, "errors": 0}
+
+def fake_structure(text: str) -> dict:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:8]
+    return {
+        "tldr": f"tldr-{digest}",
+        "motivation": f"motivation-{digest}",
+        "method": f"method-{digest}",
+        "result": f"result-{digest}",
+        "conclusion": f"conclusion-{digest}",
+    }
+
+def fake_content(messages: list) -> str:
+    user_content = messages[-1]["content"]
+    # 批量请求中每篇摘要以 "[id: xxx]" 开头
+    parts = re.split(r"^\[id: ([^\]]+)\]\n", user_content, flags=re.M)
+    if len(parts) > 1:
+        papers = []
+        for paper_id, abstract in zip(parts[1::2], parts[2::2]):
+            if random.random() < FAKE_OPENAI_BATCH_DROP_RATE:
+                continue
+            papers.append({"id": paper_id, **fake_structure(abstract.strip())})
+        return json.dumps({"papers": papers}, ensure_ascii=False)
+    return json.dumps(fake_structure(user_content), ensure_ascii=False)
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    state["requests"] += 1
+    if state["in_flight"] >= FAKE_OPENAI_MAX_CONCURRENCY:
+        state["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after": "1"},
+            content={"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+        )
+    state["in_flight"] += 1
+    try:
+        await asyncio.sleep(random.expovariate(1 / FAKE_OPENAI_LATENCY) if FAKE_OPENAI_LATENCY > 0 else 0)
+        if random.random() < FAKE_OPENAI_ERROR_RATE:
+            state["errors"] += 1
+            return JSONResponse(status_code=500, content={"error": {"message": "Internal error", "type": "server_error"}})
+        content = fake_content(body["messages"])
+        prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": f"chatcmpl-{state['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+    finally:
+        state["in_flight"] -= 1
+
+@app.get("/stats")
+def stats():
+    return state
@@ -1,11 +1,9 @@
 import os
 import json
-from feedgen.feed import FeedGenerator
 from datetime import datetime, timezone
 from fastapi import HTTPException
 from fastapi.responses import Response
 from api.database import DatabaseManager
-import requests
 from fastapi import APIRouter
 
 def get_movie_data_path():
@@ -20,6 +18,9 @@ def generate_movie_rss():
     if not movies:
         return None
 
+    # feedgen 依赖 lxml，只在生成电影RSS时导入，不影响服务冷启动
+    from feedgen.feed import FeedGenerator
+
     fg = FeedGenerator()
     fg.title('每日电影推荐')
     fg.link(href='/movie_feed', rel='self')
@@ -50,6 +51,8 @@ router = APIRouter()
 
 @router.get('/fetch_movie_daily', summary="手动抓取并保存每日电影数据")
 def fetch_movie_daily():
+    import requests
+
     url = 'https://www.cikeee.com/api?app_key=pub_23020990025'
     resp = requests.get(url, timeout=10)
     if resp.status_code != 200:
@@ -0,0 +1,136 @@
+"""后台AI增强队列的工作线程。
+
+RSS请求只把缺少AI字段的论文写入 enhance_queue 表，由这里的工作线程领取、
+调用模型并写回数据库。队列保存在数据库中，服务重启后未完成的任务会继续处理。
+
+也可以单独运行，把队列中的任务处理完后退出::
+
+    python -m ai.worker
+"""
+import os
+import sys
+import logging
+import threading
+from typing import Callable, Optional
+
+from api.database import DatabaseManager, close_pools
+from utils.ledger import Ledger
+
+# 每个服务进程中的工作线程数，为 0 时不在服务进程内处理队列
+ENHANCE_WORKERS = int(os.environ.get('ENHANCE_WORKERS', '1'))
+# 每次领取的论文数，同一批论文由增强引擎并发处理
+ENHANCE_QUEUE_BATCH = int(os.environ.get('ENHANCE_QUEUE_BATCH', '50'))
+# 队列为空时的轮询间隔（秒）
+ENHANCE_QUEUE_POLL = float(os.environ.get('ENHANCE_QUEUE_POLL', '10'))
+# 领取后超过该时间（秒）仍未完成的任务会被重新领取
+ENHANCE_QUEUE_LEASE = int(os.environ.get('ENHANCE_QUEUE_LEASE', '900'))
+
+def needs_enhancement(item: dict) -> bool:
+    # 判断AI字段是否全为空或全为None
+    ai = item.get('AI') or {}
+    return all(v is None or v == '' for v in ai.values())
+
+class EnhancementWorkerPool:
+    """从数据库队列领取任务并完成AI增强的线程池。
+
+    on_done 在每批论文写回数据库后调用，参数为本批论文的入库日期集合，
+    服务端据此让对应日期的缓存失效。
+
+    处理过的论文（无论成败）都会移出队列，失败记录在 enhance 阶段的台账中，
+    到了重试时间后由服务端重新入队，超过重试上限的论文不再入队。
+    """
+    def __init__(self, db_manager: Optional[DatabaseManager] = None, workers: int = ENHANCE_WORKERS,
+                 on_done: Optional[Callable[[set], None]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.db_manager = db_manager or DatabaseManager()
+        self.workers = workers
+        self.on_done = on_done
+        self.ledger = Ledger('enhance', self.db_manager)
+        self._threads = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def start(self):
+        if self._threads or self.workers <= 0 or not self.db_manager.conn_string:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"enhance-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.logger.info(f"已启动 {self.workers} 个AI增强工作线程。")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        """有新任务入队时立即唤醒空闲的工作线程。"""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                self.logger.error(f"AI增强工作线程出错: {e}")
+                processed = 0
+            if not processed:
+                self._wake.wait(ENHANCE_QUEUE_POLL)
+                self._wake.clear()
+
+    def run_once(self) -> int:
+        """领取并处理一批任务，返回本批论文数，队列为空时返回 0。"""
+        papers = self.db_manager.claim_enhancement(ENHANCE_QUEUE_BATCH, ENHANCE_QUEUE_LEASE)
+        if not papers:
+            return 0
+        # 领取后台账状态可能已变化（其他实例处理失败），只处理仍需重试的论文
+        due = set(self.ledger.due([d['id'] for d in papers]))
+        todo = [d for d in papers if d['id'] in due]
+        errors = {}
+        if todo:
+            from ai.enhance import run_enhancement_process
+            try:
+                run_enhancement_process(todo, errors=errors)
+            except Exception as e:
+                # 整批计为失败次数，台账达到上限后不再入队，避免租约到期后被无限次重新领取
+                self.logger.error(f"AI增强本批出错: {e}")
+                errors.update((d['id'], str(e) or type(e).__name__) for d in todo if needs_enhancement(d))
+        done = [d for d in todo if not needs_enhancement(d)]
+        for d in todo:
+            if needs_enhancement(d) and d['id'] not in errors:
+                errors[d['id']] = "AI增强结果为空"
+        if done:
+            # AI字段已变化，旧片段作废
+            for d in done:
+                d['rss_fragment'] = None
+            self.db_manager.insert_data(done)
+            self.ledger.mark_ok([d['id'] for d in done])
+        if errors:
+            self.ledger.mark_failed(errors)
+        self.db_manager.complete_enhancement([d['id'] for d in papers])
+        self.logger.info(f"AI增强队列本批完成 {len(done)} 篇，失败 {len(errors)} 篇，跳过 {len(papers) - len(todo)} 篇。")
+        if self.on_done is not None:
+            self.on_done({d['published_date'].strftime('%Y-%m-%d') for d in done if d.get('published_date')})
+        return len(papers)
+
+    def drain(self) -> int:
+        """在当前线程中处理队列直到为空。"""
+        total = 0
+        while True:
+            processed = self.run_once()
+            if not processed:
+                return total
+            total += processed
+
+if __name__ == '__main__':
+    try:
+        pool = EnhancementWorkerPool()
+        if not pool.db_manager.connect_and_create_table():
+            sys.exit(1)
+        print(f"AI增强队列处理完成，共 {pool.drain()} 篇", file=sys.stderr)
+    finally:
+        close_pools()
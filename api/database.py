@@ -1,124 +1,424 @@
 import os
-import psycopg
 import logging
+import psycopg
+from psycopg.types.json import Jsonb
+import time
+import threading
+from datetime import datetime, timezone
 from typing import Optional
+from psycopg_pool import ConnectionPool
+from utils.feed import FRAGMENT_VERSION, render_item_fragment
+
+# 连接池配置，可通过环境变量调整
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "10"))
+# 从连接池获取连接的最长等待时间（秒）
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+# 空闲连接的回收时间（秒）
+DB_POOL_MAX_IDLE = float(os.environ.get("DB_POOL_MAX_IDLE", "300"))
+# 迁移失败（通常是数据库不可用）后，在该时间（秒）内不再重试，避免每次查询都多等一次连接超时
+DB_SCHEMA_RETRY = float(os.environ.get("DB_SCHEMA_RETRY", "30"))
+# 经由 pgbouncer 事务模式等不支持预备语句的代理连接时可设为 0
+DB_PREPARE_STATEMENTS = os.environ.get("DB_PREPARE_STATEMENTS", "1") != "0"
+
+_pools = {}
+_pools_lock = threading.Lock()
+# 本进程中已执行过迁移的连接串：迁移在第一次访问数据库时执行，而不是在导入模块时
+_schema_ready = set()
+# 连接串 -> 最近一次迁移失败的时间（time.monotonic()）
+_schema_failed = {}
+_schema_lock = threading.Lock()
+
+def _configure_connection(conn):
+    # 每个连接建立时只设置一次会话时区，而不是每次查询都设置
+    conn.execute("SET TIME ZONE 'Asia/Shanghai'")
+    conn.commit()
+
+def get_pool(conn_string: str) -> ConnectionPool:
+    """返回进程内共享的连接池，同一个连接串只创建一次。"""
+    with _pools_lock:
+        pool = _pools.get(conn_string)
+        if pool is None:
+            pool = ConnectionPool(
+                conn_string,
+                min_size=DB_POOL_MIN_SIZE,
+                max_size=max(DB_POOL_MAX_SIZE, DB_POOL_MIN_SIZE),
+                timeout=DB_POOL_TIMEOUT,
+                max_idle=DB_POOL_MAX_IDLE,
+                kwargs={"prepare_threshold": 5 if DB_PREPARE_STATEMENTS else None},
+                configure=_configure_connection,
+                name="arxiv-db",
+                open=True,
+            )
+            _pools[conn_string] = pool
+        return pool
+
+def close_pools():
+    """关闭所有连接池，供进程退出（服务关闭、定时任务结束）时调用。"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+# 版本化的数据库迁移：(版本号, 描述, SQL 列表)，按版本号顺序执行，
+# 已执行的版本记录在 schema_migrations 表中，已有部署启动时会就地升级。
+# 只能追加新的迁移，不要修改已发布的迁移。
+MIGRATIONS = [
+    (1, "创建 arxiv_papers 和 daily_movie 表", [
+        """
+        CREATE TABLE IF NOT EXISTS arxiv_papers (
+            id TEXT PRIMARY KEY,
+            categories TEXT[],
+            pdf TEXT,
+            abs TEXT,
+            authors TEXT[],
+            title TEXT,
+            comment TEXT,
+            summary TEXT,
+            ai_tldr TEXT,
+            ai_motivation TEXT,
+            ai_method TEXT,
+            ai_result TEXT,
+            ai_conclusion TEXT,
+            inserted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS daily_movie (
+            mov_id TEXT PRIMARY KEY,
+            gettime BIGINT,
+            daily_word TEXT,
+            mov_title TEXT,
+            mov_text TEXT,
+            mov_link TEXT,
+            mov_rating TEXT,
+            mov_director TEXT,
+            mov_year INT,
+            mov_area TEXT,
+            mov_type TEXT[],
+            mov_pic TEXT,
+            mov_intro TEXT
+        )
+        """,
+    ]),
+    # 以显式时区（北京时间）计算入库日期并存储，查询不再依赖会话时区，且可以走索引
+    (2, "新增 published_date 存储列及索引", [
+        """
+        ALTER TABLE arxiv_papers ADD COLUMN IF NOT EXISTS published_date DATE
+            GENERATED ALWAYS AS ((inserted_at AT TIME ZONE 'Asia/Shanghai')::date) STORED
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_arxiv_papers_published_date ON arxiv_papers (published_date)",
+    ]),
+    # 分类过滤使用 categories @> ARRAY[...]，可以命中 GIN 索引
+    (3, "新增 categories GIN 索引", [
+        "CREATE INDEX IF NOT EXISTS idx_arxiv_papers_categories ON arxiv_papers USING GIN (categories)",
+    ]),
+    # 入库/增强时预先渲染好的RSS <item> 片段，生成RSS时直接拼接
+    (4, "新增预渲染的 rss_fragment 列", [
+        "ALTER TABLE arxiv_papers ADD COLUMN IF NOT EXISTS rss_fragment TEXT",
+        "ALTER TABLE arxiv_papers ADD COLUMN IF NOT EXISTS rss_fragment_version INT",
+    ]),
+    # 按 (摘要, 模型, 提示词, 语言) 哈希缓存的AI增强结果
+    (5, "创建 enhancement_cache 表", [
+        """
+        CREATE TABLE IF NOT EXISTS enhancement_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            result JSONB NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    # 后台AI增强队列，按论文 id 去重；claimed_at 为领取时间，超时未完成的任务会被重新领取
+    (6, "创建 enhance_queue 表", [
+        """
+        CREATE TABLE IF NOT EXISTS enhance_queue (
+            paper_id TEXT PRIMARY KEY REFERENCES arxiv_papers (id) ON DELETE CASCADE,
+            enqueued_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            claimed_at TIMESTAMP WITH TIME ZONE
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_enhance_queue_enqueued_at ON enhance_queue (enqueued_at)",
+    ]),
+    # 各处理阶段（详情获取、AI增强）按条目记录的状态、失败次数和下次重试时间
+    (7, "创建 item_status 表", [
+        """
+        CREATE TABLE IF NOT EXISTS item_status (
+            stage TEXT NOT NULL,
+            item_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INT NOT NULL DEFAULT 0,
+            last_error TEXT,
+            next_retry_at TIMESTAMP WITH TIME ZONE,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (stage, item_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_item_status_status ON item_status (stage, status)",
+    ]),
+    # 通过 /do 触发的定时任务及其进度，progress 由任务进程定期写入
+    (8, "创建 scheduler_jobs 表", [
+        """
+        CREATE TABLE IF NOT EXISTS scheduler_jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            progress JSONB,
+            error TEXT,
+            returncode INT,
+            started_at TIMESTAMP WITH TIME ZONE,
+            finished_at TIMESTAMP WITH TIME ZONE,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_scheduler_jobs_status ON scheduler_jobs (status)",
+    ]),
+]
+
+# 迁移期间持有的咨询锁编号，避免多个实例同时升级
+MIGRATION_LOCK_ID = 20250701
+
+# scheduler_jobs 中可由 save_job 写入的列
+JOB_COLUMNS = ["status", "progress", "error", "returncode", "started_at", "finished_at"]
+
+# insert_data 写入的列及其类型，也是 COPY 到暂存表的列顺序（二进制 COPY 需要显式类型）
+PAPER_COLUMNS = {
+    "id": "text", "categories": "text[]", "pdf": "text", "abs": "text", "authors": "text[]",
+    "title": "text", "comment": "text", "summary": "text",
+    "ai_tldr": "text", "ai_motivation": "text", "ai_method": "text", "ai_result": "text", "ai_conclusion": "text",
+    "inserted_at": "timestamptz", "updated_at": "timestamptz",
+    "rss_fragment": "text", "rss_fragment_version": "int4",
+}
+# 比较这些列判断内容是否变化（不含写入时间和由它们渲染出的片段）
+_PAPER_CONTENT_COLUMNS = [
+    "title", "summary", "authors", "categories", "pdf", "abs", "comment",
+    "ai_tldr", "ai_motivation", "ai_method", "ai_result", "ai_conclusion", "rss_fragment_version",
+]
+_PAPER_COLUMN_LIST = ", ".join(PAPER_COLUMNS)
+
+def _paper_changed(old: str, new: str) -> str:
+    """两行论文内容不同的条件，old/new 为表名或别名。"""
+    return (f"({', '.join(f'{old}.{c}' for c in _PAPER_CONTENT_COLUMNS)}) IS DISTINCT FROM "
+            f"({', '.join(f'{new}.{c}' for c in _PAPER_CONTENT_COLUMNS)})")
+
+# 内容没有变化的行不改写，也不更新 updated_at；xmax = 0 表示本次新插入的行
+_PAPER_UPSERT = f"""
+    ON CONFLICT (id) DO UPDATE SET
+        {", ".join(f"{c} = EXCLUDED.{c}" for c in PAPER_COLUMNS if c not in ("id", "inserted_at"))}
+    WHERE {_paper_changed("arxiv_papers", "EXCLUDED")}
+    RETURNING (xmax = 0) AS inserted
+"""
 
 class DatabaseManager:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
         self.conn_string = os.environ.get("DATABASE_URL")
+        # 热点查询/写入显式使用预备语句
+        self.prepare = DB_PREPARE_STATEMENTS
+        # 最近一次 insert_data 的新增/更新/未变化/失败条数
+        self.last_write_stats = {"inserted": 0, "updated": 0, "unchanged": 0, "failed": 0}
+
+    def _connection(self):
+        # 从共享连接池借出连接，会话时区已在建立连接时设置；第一次使用前先确保表结构就绪
+        # 迁移失败后的重试间隔内直接报错，不再向连接池借连接、等满 DB_POOL_TIMEOUT
+        if self.conn_string not in _schema_ready and not self.ensure_schema():
+            raise psycopg.OperationalError("数据库不可用，稍后重试")
+        return get_pool(self.conn_string).connection()
+
+    def ensure_schema(self) -> bool:
+        """每个进程对每个数据库只执行一次迁移，并发的首次请求中只有一个线程执行。
 
+        失败后 DB_SCHEMA_RETRY 秒内直接返回 False，不再重复等待连接超时。
+        """
+        with _schema_lock:
+            if self.conn_string in _schema_ready:
+                return True
+            failed_at = _schema_failed.get(self.conn_string)
+            if failed_at is not None and time.monotonic() - failed_at < DB_SCHEMA_RETRY:
+                return False
+            if self.connect_and_create_table():
+                _schema_failed.pop(self.conn_string, None)
+                return True
+            _schema_failed[self.conn_string] = time.monotonic()
+            return False
+
+    def _apply_migrations(self, conn) -> list:
+        """在一个事务中执行尚未执行的迁移，返回本次执行的 (版本号, 描述) 列表。"""
+        applied = []
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    description TEXT,
+                    applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("SELECT version FROM schema_migrations")
+            done = {row[0] for row in cur.fetchall()}
+            for version, description, statements in MIGRATIONS:
+                if version in done:
+                    continue
+                for statement in statements:
+                    cur.execute(statement)
+                cur.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                applied.append((version, description))
+        conn.commit()
+        return applied
 
     def connect_and_create_table(self):
         if not self.conn_string:
             return False
         try:
-            with psycopg.connect(self.conn_string) as conn:
-                with conn.cursor() as cur:
-                    cur.execute("SET TIME ZONE 'Asia/Shanghai'")
-                    # 创建 arxiv_papers 表
-                    cur.execute("""
-                        CREATE TABLE IF NOT EXISTS arxiv_papers (
-                            id TEXT PRIMARY KEY,
-                            categories TEXT[],
-                            pdf TEXT,
-                            abs TEXT,
-                            authors TEXT[],
-                            title TEXT,
-                            comment TEXT,
-                            summary TEXT,
-                            ai_tldr TEXT,
-                            ai_motivation TEXT,
-                            ai_method TEXT,
-                            ai_result TEXT,
-                            ai_conclusion TEXT,
-                            inserted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-                        )
-                    """)
-                    # 创建 daily_movie 表
-                    cur.execute("""
-                        CREATE TABLE IF NOT EXISTS daily_movie (
-                            mov_id TEXT PRIMARY KEY,
-                            gettime BIGINT,
-                            daily_word TEXT,
-                            mov_title TEXT,
-                            mov_text TEXT,
-                            mov_link TEXT,
-                            mov_rating TEXT,
-                            mov_director TEXT,
-                            mov_year INT,
-                            mov_area TEXT,
-                            mov_type TEXT[],
-                            mov_pic TEXT,
-                            mov_intro TEXT
-                        )
-                    """)
-                    conn.commit()
-                    self.logger.info("数据库表 'arxiv_papers' 和 'daily_movie' 已就绪。")
+            with get_pool(self.conn_string).connection() as conn:
+                applied = self._apply_migrations(conn)
+                for version, description in applied:
+                    self.logger.info(f"已执行数据库迁移 {version}: {description}")
+                self.logger.info("数据库表 'arxiv_papers' 和 'daily_movie' 已就绪。")
+            _schema_ready.add(self.conn_string)
             return True
         except Exception as e:
             self.logger.error(f"数据库连接或创建表失败: {e}")
             return False
 
+    @staticmethod
+    def _paper_row(item: dict, now: datetime) -> tuple:
+        """按 PAPER_COLUMNS 的顺序返回一篇论文的列值。"""
+        ai_data = item.get('AI') or {}
+        return (
+            item.get('id'),
+            item.get('categories'),
+            item.get('pdf'),
+            item.get('abs'),
+            item.get('authors'),
+            item.get('title'),
+            item.get('comment'),
+            item.get('summary'),
+            ai_data.get('tldr'),
+            ai_data.get('motivation'),
+            ai_data.get('method'),
+            ai_data.get('result'),
+            ai_data.get('conclusion'),
+            now,
+            now,
+            render_item_fragment(dict(item, updated_at=now)),
+            FRAGMENT_VERSION,
+        )
+
+    @staticmethod
+    def _bulk_upsert(conn, rows: list) -> tuple:
+        """COPY 到临时暂存表后一条语句合并，返回 (新增数, 更新数)。"""
+        with conn.cursor() as cur:
+            # 暂存表在事务结束时自动删除；表每次重建，相关语句不使用预备语句
+            cur.execute(f"""
+                CREATE TEMP TABLE arxiv_papers_stage ON COMMIT DROP AS
+                SELECT {_PAPER_COLUMN_LIST} FROM arxiv_papers WITH NO DATA
+            """, prepare=False)
+            with cur.copy(f"COPY arxiv_papers_stage ({_PAPER_COLUMN_LIST}) FROM STDIN (FORMAT BINARY)") as copy:
+                copy.set_types(list(PAPER_COLUMNS.values()))
+                for row in rows:
+                    copy.write_row(row)
+            cur.execute(f"""
+                WITH merged AS (
+                    INSERT INTO arxiv_papers ({_PAPER_COLUMN_LIST})
+                    SELECT {", ".join(f"s.{c}" for c in PAPER_COLUMNS)}
+                    FROM arxiv_papers_stage s
+                    LEFT JOIN arxiv_papers p ON p.id = s.id
+                    -- 先用连接排除未变化的行，它们不进入 INSERT 的冲突处理
+                    WHERE p.id IS NULL OR {_paper_changed("p", "s")}
+                    {_PAPER_UPSERT}
+                )
+                SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM merged
+            """, prepare=False)
+            inserted, updated = cur.fetchone()
+        return inserted, updated
+
+    def _upsert_rows(self, conn, rows: list) -> tuple:
+        """在一个事务中逐行写入，每行使用保存点，单行失败只回滚该行。返回 (新增数, 更新数, 失败数)。"""
+        inserted = updated = failed = 0
+        with conn.transaction(), conn.cursor() as cur:
+            for row in rows:
+                try:
+                    with conn.transaction():
+                        cur.execute(f"""
+                            INSERT INTO arxiv_papers ({_PAPER_COLUMN_LIST})
+                            VALUES ({', '.join(['%s'] * len(PAPER_COLUMNS))})
+                            {_PAPER_UPSERT}
+                        """, row, prepare=self.prepare)
+                        result = cur.fetchone()
+                except Exception as e:
+                    self.logger.error(f"插入或更新ID {row[0]} 时出错: {e}")
+                    failed += 1
+                    continue
+                if result is None:
+                    continue
+                if result[0]:
+                    inserted += 1
+                else:
+                    updated += 1
+        return inserted, updated, failed
+
     def insert_data(self, data: list):
+        """写入一批论文，返回新增和更新的行数之和，各类计数保存在 last_write_stats 中。
+
+        整批 COPY 到临时暂存表后用一条 INSERT ... SELECT ... ON CONFLICT 合并，
+        内容没有变化的行不改写；合并失败（例如某行数据不合法）时回退为逐行写入。
+        """
         if not self.conn_string:
             self.logger.error("数据库连接字符串无效，跳过数据插入。")
             return 0
-        inserted_count = 0
-        try:
-            with psycopg.connect(self.conn_string) as conn:
-                with conn.cursor() as cur:
-                    cur.execute("SET TIME ZONE 'Asia/Shanghai'")
-                    for item in data:
-                        ai_data = item.get('AI', {})
-                        try:
-                            cur.execute("""
-                                INSERT INTO arxiv_papers (
-                                    id, categories, pdf, abs, authors, title, comment, summary,
-                                    ai_tldr, ai_motivation, ai_method, ai_result, ai_conclusion, inserted_at, updated_at
-                                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-                                ON CONFLICT (id) DO UPDATE SET
-                                    title = EXCLUDED.title,
-                                    summary = EXCLUDED.summary,
-                                    authors = EXCLUDED.authors,
-                                    categories = EXCLUDED.categories,
-                                    pdf = EXCLUDED.pdf,
-                                    abs = EXCLUDED.abs,
-                                    comment = EXCLUDED.comment,
-                                    ai_tldr = EXCLUDED.ai_tldr,
-                                    ai_motivation = EXCLUDED.ai_motivation,
-                                    ai_method = EXCLUDED.ai_method,
-                                    ai_result = EXCLUDED.ai_result,
-                                    ai_conclusion = EXCLUDED.ai_conclusion,
-                                    updated_at = NOW()
-                            """, (
-                                item.get('id'),
-                                item.get('categories'), 
-                                item.get('pdf'),
-                                item.get('abs'),
-                                item.get('authors'),
-                                item.get('title'),
-                                item.get('comment'),
-                                item.get('summary'),
-                                ai_data.get('tldr'),
-                                ai_data.get('motivation'),
-                                ai_data.get('method'),
-                                ai_data.get('result'),
-                                ai_data.get('conclusion')
-                            ))
-                            if cur.rowcount > 0:
-                                inserted_count += 1
-                        except Exception as insert_e:
-                            self.logger.error(f"插入或更新ID {item.get('id')} 时出错: {insert_e}")
-                conn.commit()
-            self.logger.info(f"数据库存储完成，成功插入 {inserted_count} 条数据。")
-            return inserted_count
+        # 同一批中重复的 id 只保留最后一条，否则合并时同一行会被更新两次而报错
+        items = list({item.get('id'): item for item in data if item.get('id')}.values())
+        if not items:
+            return 0
+        # 在应用侧确定写入时间，使预渲染片段中的 pubDate 与 updated_at 一致
+        now = datetime.now(timezone.utc)
+        rows = [self._paper_row(item, now) for item in items]
+        try:
+            with self._connection() as conn:
+                try:
+                    inserted, updated = self._bulk_upsert(conn, rows)
+                    failed = 0
+                    conn.commit()
+                except Exception as bulk_e:
+                    conn.rollback()
+                    self.logger.warning(f"批量写入失败，改为逐行写入: {bulk_e}")
+                    inserted, updated, failed = self._upsert_rows(conn, rows)
+                    conn.commit()
+            unchanged = len(rows) - inserted - updated - failed
+            self.last_write_stats = {"inserted": inserted, "updated": updated, "unchanged": unchanged, "failed": failed}
+            self.logger.info(f"数据库存储完成，新增 {inserted} 条，更新 {updated} 条，{unchanged} 条未变化，{failed} 条失败。")
+            return inserted + updated
         except Exception as e:
             self.logger.error(f"数据库操作失败: {e}")
             return 0
 
+    @staticmethod
+    def _row_to_paper(columns, row) -> dict:
+        item = dict(zip(columns, row))
+        # 确保 categories 是列表，并处理 AI 字段
+        if item.get('categories') and not isinstance(item['categories'], list):
+            item['categories'] = item['categories'].strip('{}').split(',') if item['categories'] else []
+        elif item.get('categories') is None:
+            item['categories'] = []
+
+        ai_data = {
+            'tldr': item.pop('ai_tldr'),
+            'motivation': item.pop('ai_motivation'),
+            'method': item.pop('ai_method'),
+            'result': item.pop('ai_result'),
+            'conclusion': item.pop('ai_conclusion')
+        }
+        item['AI'] = ai_data
+        # 渲染规则已变化的旧片段视为不存在，由调用方重新渲染
+        if item.pop('rss_fragment_version', None) != FRAGMENT_VERSION:
+            item['rss_fragment'] = None
+        return item
+
     def get_papers_by_date(self, date_str: str, category: Optional[str] = None) -> list:
         if not self.conn_string:
             self.logger.error("数据库连接字符串无效，无法获取数据。")
@@ -126,57 +426,398 @@ class DatabaseManager:
         
         papers = []
         try:
-            with psycopg.connect(self.conn_string) as conn:
+            with self._connection() as conn:
                 with conn.cursor() as cur:
-                    # Set the session timezone to Asia/Shanghai (Beijing time)
-                    cur.execute("SET TIME ZONE 'Asia/Shanghai'")
-
                     # 构建查询
                     query = """
                         SELECT id, categories, pdf, abs, authors, title, comment, summary, updated_at,
-                               ai_tldr, ai_motivation, ai_method, ai_result, ai_conclusion
+                               ai_tldr, ai_motivation, ai_method, ai_result, ai_conclusion,
+                               rss_fragment, rss_fragment_version
                         FROM arxiv_papers
-                        WHERE inserted_at::date = %s
+                        WHERE published_date = %s
                     """
                     params = [date_str]
 
                     if category:
-                        query += " AND %s = ANY(categories)"
+                        query += " AND categories @> ARRAY[%s]::text[]"
                         params.append(category)
                     
-                    cur.execute(query, params)
+                    cur.execute(query, params, prepare=self.prepare)
                     columns = [desc[0] for desc in cur.description]
                     for row in cur.fetchall():
-                        item = dict(zip(columns, row))
-                        # 确保 categories 是列表，并处理 AI 字段
-                        if item.get('categories') and not isinstance(item['categories'], list):
-                            item['categories'] = item['categories'].strip('{}').split(',') if item['categories'] else []
-                        elif item.get('categories') is None:
-                            item['categories'] = []
-                        
-                        ai_data = {
-                            'tldr': item.pop('ai_tldr'),
-                            'motivation': item.pop('ai_motivation'),
-                            'method': item.pop('ai_method'),
-                            'result': item.pop('ai_result'),
-                            'conclusion': item.pop('ai_conclusion')
-                        }
-                        item['AI'] = ai_data
-                        papers.append(item)
+                        papers.append(self._row_to_paper(columns, row))
             self.logger.info(f"从数据库获取 {len(papers)} 条数据，日期: {date_str}, 类别: {category}")
             return papers
         except Exception as e:
             self.logger.error(f"从数据库获取数据失败: {e}")
             return [] 
 
+    def get_papers_between(self, start: str, end: str, category: Optional[str] = None) -> list:
+        """一次查询返回 [start, end] 日期区间内的全部论文（按 id 去重）。
+
+        结果按入库日期倒序排列，每条记录带有 ``published_date`` 字段，
+        调用方可据此按天分组缓存。
+        """
+        if not self.conn_string:
+            self.logger.error("数据库连接字符串无效，无法获取数据。")
+            return []
+
+        papers = []
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    query = """
+                        SELECT id, categories, pdf, abs, authors, title, comment, summary, updated_at,
+                               ai_tldr, ai_motivation, ai_method, ai_result, ai_conclusion,
+                               rss_fragment, rss_fragment_version, published_date
+                        FROM arxiv_papers
+                        WHERE published_date BETWEEN %s AND %s
+                    """
+                    params = [start, end]
+
+                    if category:
+                        query += " AND categories @> ARRAY[%s]::text[]"
+                        params.append(category)
+                    query += " ORDER BY published_date DESC, inserted_at, id"
+
+                    cur.execute(query, params, prepare=self.prepare)
+                    columns = [desc[0] for desc in cur.description]
+                    for row in cur.fetchall():
+                        papers.append(self._row_to_paper(columns, row))
+            self.logger.info(f"从数据库获取 {len(papers)} 条数据，日期: {start} ~ {end}, 类别: {category}")
+            return papers
+        except Exception as e:
+            self.logger.error(f"从数据库获取数据失败: {e}")
+            return []
+
+    def iter_papers_between(self, start: str, end: str, category: Optional[str] = None,
+                            oldest_first: bool = False, like_patterns: Optional[list] = None,
+                            itersize: int = 500):
+        """按键集分页逐批读取 [start, end] 区间内的论文，内存占用与区间大小无关。
+
+        每批查询完成后立即归还连接，客户端下载再慢也不会一直占用连接池中的连接。
+        查询出错时记录日志后重新抛出异常。
+        oldest_first 为 True 时按与 get_papers_between 相反的顺序返回；
+        like_patterns 为 utils.index.keyword_like_patterns 的结果，用于在数据库端预先过滤关键字。
+        """
+        if not self.conn_string:
+            self.logger.error("数据库连接字符串无效，无法获取数据。")
+            return
+        query = """
+            SELECT id, categories, pdf, abs, authors, title, comment, summary, updated_at,
+                   ai_tldr, ai_motivation, ai_method, ai_result, ai_conclusion,
+                   rss_fragment, rss_fragment_version, published_date, inserted_at
+            FROM arxiv_papers
+            WHERE published_date BETWEEN %s AND %s
+        """
+        params = [start, end]
+        if category:
+            query += " AND categories @> ARRAY[%s]::text[]"
+            params.append(category)
+        if like_patterns:
+            # 与 utils.index.paper_text 拼接方式相同；to_tsquery 的分词与 Python 端不一致，且无法表达子串匹配
+            text = "lower(coalesce(title, '') || ' ' || coalesce(summary, ''))"
+            query += " AND (" + " OR ".join(
+                "(" + " AND ".join(f"{text} LIKE %s" for _ in patterns) + ")" for patterns in like_patterns
+            ) + ")"
+            params.extend(pattern for patterns in like_patterns for pattern in patterns)
+        # published_date 由 inserted_at 生成，从上一批最后一行 (published_date, inserted_at, id) 之后继续
+        if oldest_first:
+            after = " AND (published_date > %s OR (published_date = %s AND (inserted_at, id) < (%s, %s)))"
+            order = " ORDER BY published_date, inserted_at DESC, id DESC LIMIT %s"
+        else:
+            after = " AND (published_date < %s OR (published_date = %s AND (inserted_at, id) > (%s, %s)))"
+            order = " ORDER BY published_date DESC, inserted_at, id LIMIT %s"
+        count = 0
+        last = None
+        try:
+            while True:
+                with self._connection() as conn:
+                    with conn.cursor() as cur:
+                        if last is None:
+                            cur.execute(query + order, params + [itersize], prepare=self.prepare)
+                        else:
+                            cur.execute(query + after + order,
+                                        params + [last[0], last[0], last[1], last[2], itersize],
+                                        prepare=self.prepare)
+                        columns = [desc[0] for desc in cur.description]
+                        rows = cur.fetchall()
+                papers = [self._row_to_paper(columns, row) for row in rows]
+                for paper in papers:
+                    last = (paper['published_date'], paper.pop('inserted_at'), paper['id'])
+                    count += 1
+                    yield paper
+                if len(rows) < itersize:
+                    break
+            self.logger.info(f"流式读取 {count} 条数据，日期: {start} ~ {end}, 类别: {category}")
+        except Exception as e:
+            # 不能吞掉异常：否则客户端会收到被截断却带有完整 ETag 的 200 响应
+            self.logger.error(f"流式读取数据失败: {e}")
+            raise
+
+    def get_papers_version(self, start: str, end: str, category: Optional[str] = None) -> tuple:
+        """返回 [start, end] 区间内论文的 (条数, 最大 updated_at)，用作流式RSS的数据版本。"""
+        if not self.conn_string:
+            return 0, None
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    query = """
+                        SELECT count(*), max(updated_at) FROM arxiv_papers
+                        WHERE published_date BETWEEN %s AND %s
+                    """
+                    params = [start, end]
+                    if category:
+                        query += " AND categories @> ARRAY[%s]::text[]"
+                        params.append(category)
+                    cur.execute(query, params, prepare=self.prepare)
+                    return tuple(cur.fetchone())
+        except Exception as e:
+            # 查询失败时不能返回 (0, None)，否则会据此生成 ETag
+            self.logger.error(f"获取数据版本失败: {e}")
+            raise
+
+    def get_complete_paper_ids(self, paper_ids: list) -> set:
+        """一次查询返回已入库且信息完整（有标题、摘要和AI字段）的论文 id。"""
+        if not self.conn_string or not paper_ids:
+            return set()
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT id FROM arxiv_papers
+                        WHERE id = ANY(%s)
+                          AND coalesce(title, '') <> '' AND coalesce(summary, '') <> ''
+                          AND concat(ai_tldr, ai_motivation, ai_method, ai_result, ai_conclusion) <> ''
+                    """, (list(paper_ids),), prepare=self.prepare)
+                    return {row[0] for row in cur.fetchall()}
+        except Exception as e:
+            self.logger.error(f"查询已入库论文失败: {e}")
+            return set()
+
+    def get_enhancement_cache(self, keys: list) -> dict:
+        """批量查询AI增强缓存，返回 {key: result}。"""
+        if not self.conn_string or not keys:
+            return {}
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "SELECT key, result FROM enhancement_cache WHERE key = ANY(%s)",
+                        (list(keys),), prepare=self.prepare
+                    )
+                    return {key: result for key, result in cur.fetchall()}
+        except Exception as e:
+            self.logger.error(f"读取AI增强缓存失败: {e}")
+            return {}
+
+    def put_enhancement_cache(self, entries: dict, model: str) -> int:
+        """写入AI增强缓存，entries 为 {key: result}。"""
+        if not self.conn_string or not entries:
+            return 0
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.executemany("""
+                        INSERT INTO enhancement_cache (key, model, result) VALUES (%s, %s, %s)
+                        ON CONFLICT (key) DO UPDATE SET result = EXCLUDED.result, model = EXCLUDED.model
+                    """, [(key, model, Jsonb(result)) for key, result in entries.items()])
+                conn.commit()
+            return len(entries)
+        except Exception as e:
+            self.logger.error(f"写入AI增强缓存失败: {e}")
+            return 0
+
+    def enqueue_enhancement(self, paper_ids: list) -> int:
+        """把论文加入后台AI增强队列，已在队列中的论文不会重复加入，返回新加入的数量。"""
+        if not self.conn_string or not paper_ids:
+            return 0
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        INSERT INTO enhance_queue (paper_id)
+                        SELECT id FROM arxiv_papers WHERE id = ANY(%s)
+                        ON CONFLICT (paper_id) DO NOTHING
+                    """, (list(paper_ids),), prepare=self.prepare)
+                    added = cur.rowcount
+                conn.commit()
+            if added:
+                self.logger.info(f"{added} 篇论文加入AI增强队列。")
+            return added
+        except Exception as e:
+            self.logger.error(f"加入AI增强队列失败: {e}")
+            return 0
+
+    def claim_enhancement(self, limit: int, lease_seconds: int) -> list:
+        """领取最多 limit 篇待增强的论文并返回完整记录。
+
+        使用 FOR UPDATE SKIP LOCKED，多个进程/线程可以同时领取而互不重复；
+        领取后 lease_seconds 秒内未完成的任务（例如进程崩溃）会被再次领取。
+        """
+        if not self.conn_string:
+            return []
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        WITH picked AS (
+                            SELECT paper_id FROM enhance_queue
+                            WHERE claimed_at IS NULL OR claimed_at < now() - make_interval(secs => %s)
+                            ORDER BY enqueued_at
+                            LIMIT %s
+                            FOR UPDATE SKIP LOCKED
+                        )
+                        UPDATE enhance_queue q SET claimed_at = now()
+                        FROM picked WHERE q.paper_id = picked.paper_id
+                        RETURNING q.paper_id
+                    """, (lease_seconds, limit))
+                    paper_ids = [row[0] for row in cur.fetchall()]
+                    papers = []
+                    if paper_ids:
+                        cur.execute("""
+                            SELECT id, categories, pdf, abs, authors, title, comment, summary, updated_at,
+                                   ai_tldr, ai_motivation, ai_method, ai_result, ai_conclusion,
+                                   rss_fragment, rss_fragment_version, published_date
+                            FROM arxiv_papers
+                            WHERE id = ANY(%s)
+                        """, (paper_ids,))
+                        columns = [desc[0] for desc in cur.description]
+                        papers = [self._row_to_paper(columns, row) for row in cur.fetchall()]
+                conn.commit()
+            return papers
+        except Exception as e:
+            self.logger.error(f"领取AI增强任务失败: {e}")
+            return []
+
+    def complete_enhancement(self, paper_ids: list) -> int:
+        """增强完成后把论文移出队列。"""
+        if not self.conn_string or not paper_ids:
+            return 0
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("DELETE FROM enhance_queue WHERE paper_id = ANY(%s)", (list(paper_ids),))
+                    removed = cur.rowcount
+                conn.commit()
+            return removed
+        except Exception as e:
+            self.logger.error(f"更新AI增强队列失败: {e}")
+            return 0
+
+    def enhancement_queue_stats(self) -> dict:
+        if not self.conn_string:
+            return {}
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT count(*), count(claimed_at), min(enqueued_at) FROM enhance_queue
+                    """)
+                    total, claimed, oldest = cur.fetchone()
+                    cur.execute("SELECT status, count(*) FROM item_status WHERE stage = 'enhance' GROUP BY status")
+                    ledger = dict(cur.fetchall())
+            return {'queued': total, 'claimed': claimed, 'oldest': oldest, 'ledger': ledger}
+        except Exception as e:
+            self.logger.error(f"查询AI增强队列失败: {e}")
+            return {}
+
+    def get_item_status(self, stage: str, item_ids: list) -> dict:
+        """批量查询某阶段的条目状态，返回 {item_id: (status, attempts, last_error, next_retry_at)}。"""
+        if not self.conn_string or not item_ids:
+            return {}
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT item_id, status, attempts, last_error, next_retry_at
+                        FROM item_status WHERE stage = %s AND item_id = ANY(%s)
+                    """, (stage, list(item_ids)), prepare=self.prepare)
+                    return {row[0]: row[1:] for row in cur.fetchall()}
+        except Exception as e:
+            self.logger.error(f"读取条目状态失败: {e}")
+            return {}
+
+    def put_item_status(self, stage: str, rows: list) -> int:
+        """写入条目状态，rows 为 (item_id, status, attempts, last_error, next_retry_at) 列表。"""
+        if not self.conn_string or not rows:
+            return 0
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.executemany("""
+                        INSERT INTO item_status (stage, item_id, status, attempts, last_error, next_retry_at, updated_at)
+                        VALUES (%s, %s, %s, %s, %s, %s, now())
+                        ON CONFLICT (stage, item_id) DO UPDATE SET
+                            status = EXCLUDED.status,
+                            attempts = EXCLUDED.attempts,
+                            last_error = EXCLUDED.last_error,
+                            next_retry_at = EXCLUDED.next_retry_at,
+                            updated_at = EXCLUDED.updated_at
+                    """, [(stage, *row) for row in rows])
+                conn.commit()
+            return len(rows)
+        except Exception as e:
+            self.logger.error(f"写入条目状态失败: {e}")
+            return 0
+
+    def save_job(self, job_id: str, **fields) -> bool:
+        """创建或更新定时任务记录，只写入给出的列（见 JOB_COLUMNS）。"""
+        if not self.conn_string:
+            return False
+        fields = {k: Jsonb(v) if k == 'progress' else v for k, v in fields.items() if k in JOB_COLUMNS}
+        columns = list(fields)
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    # 任务进程只更新进度，记录由服务进程创建
+                    cur.execute(f"""
+                        UPDATE scheduler_jobs SET {", ".join(f"{c} = %s" for c in columns)}, updated_at = now()
+                        WHERE id = %s
+                    """, (*fields.values(), job_id))
+                    if cur.rowcount == 0:
+                        cur.execute(f"""
+                            INSERT INTO scheduler_jobs (id, {", ".join(columns)})
+                            VALUES (%s, {", ".join(["%s"] * len(columns))})
+                        """, (job_id, *fields.values()))
+                conn.commit()
+            return True
+        except Exception as e:
+            self.logger.error(f"保存任务 {job_id} 失败: {e}")
+            return False
+
+    def get_jobs(self, job_id: Optional[str] = None, status: Optional[str] = None) -> list:
+        """按 id 或状态查询定时任务，按开始时间倒序。"""
+        if not self.conn_string:
+            return []
+        conditions, params = [], []
+        if job_id is not None:
+            conditions.append("id = %s")
+            params.append(job_id)
+        if status is not None:
+            conditions.append("status = %s")
+            params.append(status)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"""
+                        SELECT id, {", ".join(JOB_COLUMNS)}, updated_at FROM scheduler_jobs
+                        {where} ORDER BY started_at DESC NULLS LAST LIMIT 100
+                    """, params)
+                    columns = [desc[0] for desc in cur.description]
+                    return [dict(zip(columns, row)) for row in cur.fetchall()]
+        except Exception as e:
+            self.logger.error(f"查询任务失败: {e}")
+            return []
+
     def insert_daily_movie(self, data: dict):
         if not self.conn_string:
             self.logger.error("数据库连接字符串无效，跳过电影数据插入。")
             return 0
         try:
-            with psycopg.connect(self.conn_string) as conn:
+            with self._connection() as conn:
                 with conn.cursor() as cur:
-                    cur.execute("SET TIME ZONE 'Asia/Shanghai'")
                     cur.execute("""
                         INSERT INTO daily_movie (
                             mov_id, gettime, daily_word, mov_title, mov_text, mov_link, mov_rating, mov_director, mov_year, mov_area, mov_type, mov_pic, mov_intro
@@ -221,9 +862,8 @@ class DatabaseManager:
         if not self.conn_string:
             self.logger.error("数据库连接字符串无效，无法获取电影数据。"); return []
         try:
-            with psycopg.connect(self.conn_string) as conn:
+            with self._connection() as conn:
                 with conn.cursor() as cur:
-                    cur.execute("SET TIME ZONE 'Asia/Shanghai'")
                     cur.execute("SELECT * FROM daily_movie ORDER BY gettime DESC")
                     rows = cur.fetchall()
                     columns = [desc[0] for desc in cur.description]
@@ -1,6 +1,6 @@
 from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
 import os
 import sys
 
@@ -8,8 +8,10 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # 导入rss_server中的应用和函数
-from rss_server import app, generate_rss_xml
-import subprocess
+from rss_server import app, db_manager, generate_rss_xml
+from api.jobs import FAILED, SUCCEEDED, JobManager, JobUnavailableError
+
+job_manager = JobManager(db_manager)
 
 # 配置CORS
 app.add_middleware(
@@ -27,12 +29,26 @@ def read_root():
 # 定义定时任务
 
 @app.get('/do')
-def my_scheduled_task():
-    result = subprocess.run(["python", "-m","scheduler.index"])
-    if result.returncode == 0:
-        print("定时任务成功")
-    else:
-        print("定时任务失败")
+def my_scheduled_task(wait: bool = Query(False, description="是否等待任务结束后再返回（Vercel Cron 使用）")):
+    # 默认在后台运行并立即返回任务 id；从当天的检查点继续，上一次超时或失败时不重做已完成的部分
+    try:
+        job_id, started = job_manager.start(wait=wait)
+    except JobUnavailableError as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "detail": str(e)})
+    if not started:
+        return JSONResponse(status_code=409, content={"job_id": job_id, "status": "running", "detail": "已有定时任务在运行"})
+    if wait:
+        job = job_manager.store.get(job_id) or {}
+        status = job.get('status', FAILED)
+        return JSONResponse(status_code=200 if status == SUCCEEDED else 500, content={"job_id": job_id, "status": status})
+    return JSONResponse(status_code=202, content={"job_id": job_id, "status": "running"})
+
+@app.get('/jobs/{job_id}')
+def get_job(job_id: str):
+    job = job_manager.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"未找到任务 {job_id}")
+    return job
 
 
 # 添加API文档路由
@@ -45,6 +61,23 @@ def api_docs():
                 "method": "GET",
                 "description": "健康检查端点"
             },
+            {
+                "path": "/do",
+                "method": "GET",
+                "description": "在后台启动一次定时任务，立即返回任务 id；已有任务在运行时返回 409 和该任务的 id，数据库不可用时返回 503",
+                "params": [
+                    {"name": "wait", "type": "boolean", "required": False,
+                     "description": "为 true 时等任务结束后再返回，成功 200、失败 500（Vercel Cron 使用）"}
+                ]
+            },
+            {
+                "path": "/jobs/{job_id}",
+                "method": "GET",
+                "description": "查询定时任务的状态、各阶段进度、计数和耗时",
+                "params": [
+                    {"name": "job_id", "type": "string", "required": True, "description": "/do 返回的任务 id"}
+                ]
+            },
             {
                 "path": "/feed",
                 "method": "GET",
@@ -0,0 +1,225 @@
+"""通过 /do 触发的定时任务。
+
+/do 在后台子进程中运行 ``python -m scheduler.index --resume --job-id <id>`` 并立即返回任务 id，
+/jobs/{id} 查询任务状态和各阶段进度。同一时间只允许一个任务运行：配置了数据库时使用
+Postgres 会话级咨询锁（多个服务实例之间也有效），否则使用 DATA_DIR 下的文件锁。
+
+任务记录保存在 scheduler_jobs 表中，没有数据库时保存在 DATA_DIR/jobs/ 下的 JSON 文件中。
+"""
+import os
+import sys
+import json
+import uuid
+import fcntl
+import logging
+import threading
+import subprocess
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import psycopg
+
+from api.database import DatabaseManager, JOB_COLUMNS
+
+DATA_DIR = os.environ.get('DATA_DIR', 'data')
+# 任务进程写入进度的间隔（秒）
+JOB_PROGRESS_INTERVAL = float(os.environ.get('JOB_PROGRESS_INTERVAL', '5'))
+# 定时任务持有的咨询锁编号（与迁移锁不同）
+SCHEDULER_LOCK_ID = 20250702
+# 获取运行锁时连接数据库的超时（秒），数据库不可用时 /do 应尽快返回 503
+RUN_LOCK_CONNECT_TIMEOUT = int(os.environ.get('RUN_LOCK_CONNECT_TIMEOUT', '5'))
+
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+# 任务记录仍为 running，但锁已释放：运行它的服务进程异常退出了
+INTERRUPTED = 'interrupted'
+
+def _now():
+    return datetime.now(timezone.utc)
+
+class JobUnavailableError(RuntimeError):
+    """无法判断是否已有任务在运行（数据库不可用），此时不能启动新任务。"""
+
+class JobStore:
+    """任务记录的存取，优先使用数据库，否则使用 JSON 文件。"""
+    def __init__(self, db_manager: Optional[DatabaseManager] = None, data_dir: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.db_manager = db_manager or DatabaseManager()
+        self.dir = os.path.join(data_dir or DATA_DIR, 'jobs')
+
+    def _path(self, job_id: str, suffix: str = '') -> str:
+        return os.path.join(self.dir, f"{job_id}{suffix}.json")
+
+    @staticmethod
+    def _read(path: str) -> dict:
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @staticmethod
+    def _write(path: str, data: dict):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False,
+                      default=lambda o: o.isoformat() if isinstance(o, datetime) else str(o))
+        os.replace(tmp_path, path)
+
+    def save(self, job_id: str, **fields):
+        if self.db_manager.conn_string:
+            self.db_manager.save_job(job_id, **fields)
+            return
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            # 进度由任务进程写入，其余字段由服务进程写入，分开存放避免互相覆盖
+            if 'progress' in fields:
+                self._write(self._path(job_id, '.progress'), fields.pop('progress'))
+            if fields:
+                job = self._read(self._path(job_id))
+                job.update({k: v for k, v in fields.items() if k in JOB_COLUMNS}, id=job_id, updated_at=_now())
+                self._write(self._path(job_id), job)
+        except Exception as e:
+            self.logger.error(f"保存任务 {job_id} 失败: {e}")
+
+    def get(self, job_id: str) -> Optional[dict]:
+        if self.db_manager.conn_string:
+            jobs = self.db_manager.get_jobs(job_id=job_id)
+            return jobs[0] if jobs else None
+        job = self._read(self._path(job_id))
+        if not job:
+            return None
+        job['progress'] = self._read(self._path(job_id, '.progress')) or None
+        return job
+
+    def running(self) -> list:
+        if self.db_manager.conn_string:
+            return self.db_manager.get_jobs(status=RUNNING)
+        if not os.path.isdir(self.dir):
+            return []
+        jobs = [self._read(os.path.join(self.dir, name)) for name in os.listdir(self.dir)
+                if name.endswith('.json') and not name.endswith('.progress.json')]
+        return sorted((job for job in jobs if job.get('status') == RUNNING),
+                      key=lambda job: str(job.get('started_at')), reverse=True)
+
+class RunLock:
+    """保证同一时间只有一个定时任务在运行的锁，持有期间占用一个专用的数据库连接或文件句柄。"""
+    def __init__(self, conn_string: Optional[str] = None, path: Optional[str] = None):
+        self.conn_string = conn_string
+        self.path = path or os.path.join(DATA_DIR, 'scheduler.lock')
+        self._conn = None
+        self._file = None
+
+    def acquire(self) -> bool:
+        if self.conn_string:
+            # 会话级锁随连接关闭（包括进程退出）自动释放，不能使用连接池中的连接
+            conn = psycopg.connect(self.conn_string, autocommit=True, connect_timeout=RUN_LOCK_CONNECT_TIMEOUT)
+            if not conn.execute("SELECT pg_try_advisory_lock(%s)", (SCHEDULER_LOCK_ID,)).fetchone()[0]:
+                conn.close()
+                return False
+            self._conn = conn
+            return True
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        f = open(self.path, 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+class JobManager:
+    def __init__(self, db_manager: Optional[DatabaseManager] = None, data_dir: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.store = JobStore(db_manager, data_dir)
+        self.lock_path = os.path.join(data_dir or DATA_DIR, 'scheduler.lock')
+
+    def start(self, wait: bool = False) -> tuple:
+        """启动一次定时任务，返回 (任务 id, 是否新启动)；已有任务在运行时返回该任务的 id。
+
+        wait 为 True 时在当前线程中运行到结束再返回。Vercel 等在响应发出后冻结实例的平台上，
+        后台线程和子进程无法继续运行，定时触发必须使用这种方式。
+
+        数据库不可用时抛出 JobUnavailableError：此时改用文件锁无法与其他实例互斥，任务记录也无法保存。
+        """
+        lock = RunLock(self.store.db_manager.conn_string, self.lock_path)
+        try:
+            acquired = lock.acquire()
+        except psycopg.OperationalError as e:
+            self.logger.error(f"获取定时任务锁失败: {e}")
+            raise JobUnavailableError("数据库不可用，暂时无法启动定时任务") from e
+        if not acquired:
+            running = self.store.running()
+            return (running[0]['id'] if running else None), False
+        try:
+            # 拿到了锁说明没有任务在运行，仍标记为 running 的记录来自异常退出的服务进程
+            for job in self.store.running():
+                self.store.save(job['id'], status=INTERRUPTED, finished_at=_now())
+            job_id = _now().strftime('%Y%m%d%H%M%S-') + uuid.uuid4().hex[:8]
+            self.store.save(job_id, status=RUNNING, started_at=_now())
+            if not wait:
+                threading.Thread(target=self._run, args=(job_id, lock), name=f"job-{job_id}", daemon=True).start()
+        except Exception:
+            lock.release()
+            raise
+        self.logger.info(f"定时任务 {job_id} 已启动")
+        if wait:
+            self._run(job_id, lock)
+        return job_id, True
+
+    def _run(self, job_id: str, lock: RunLock):
+        try:
+            result = subprocess.run([sys.executable, "-m", "scheduler.index", "--resume", "--job-id", job_id])
+            status = SUCCEEDED if result.returncode == 0 else FAILED
+            self.store.save(job_id, status=status, returncode=result.returncode, finished_at=_now())
+            self.logger.info(f"定时任务 {job_id} 结束：{status}")
+        except Exception as e:
+            self.logger.error(f"定时任务 {job_id} 运行出错: {e}")
+            self.store.save(job_id, status=FAILED, error=str(e), finished_at=_now())
+        finally:
+            lock.release()
+
+class ProgressReporter:
+    """在任务进程中定期把 snapshot() 的结果写入任务记录，stop() 时再写入一次最终进度。"""
+    def __init__(self, store: JobStore, job_id: str, snapshot: Callable[[], dict],
+                 interval: float = JOB_PROGRESS_INTERVAL):
+        self.logger = logging.getLogger(__name__)
+        self.store = store
+        self.job_id = job_id
+        self.snapshot = snapshot
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def report(self):
+        try:
+            self.store.save(self.job_id, progress=self.snapshot())
+        except Exception as e:
+            self.logger.warning(f"写入任务 {self.job_id} 进度失败: {e}")
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def start(self):
+        self.report()
+        self._thread = threading.Thread(target=self._loop, name=f"job-progress-{self.job_id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.report()
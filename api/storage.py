@@ -0,0 +1,302 @@
+"""RSS 服务读取论文的存储后端。
+
+STORAGE_BACKEND 选择后端：
+
+    postgres  通过 DatabaseManager 查询 arxiv_papers 表
+    jsonl     直接读取 DATA_DIR 下按天保存的 JSONL 文件，不需要数据库
+    不设置时配置了 DATABASE_URL 则用 postgres，否则用 jsonl
+
+jsonl 后端读取定时任务发布的数据文件（见 scheduler/checkpoint.py）：{date}_AI_enhanced_{language}.jsonl
+中有的论文使用增强后的记录，其余论文使用 {date}.jsonl 中的记录（不含AI字段）。每个文件用 mmap 打开，
+并建立偏移索引（id -> 字节区间，分类 -> id），生成RSS时只解析需要的记录。索引保存在
+旁边的 .idx 文件中，文件追加内容后只索引新增的部分，文件被替换（inode 变化）时重建。
+"""
+import os
+import re
+import json
+import mmap
+import logging
+import threading
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timezone
+from typing import Iterator, Optional
+
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', '')
+DATA_DIR = os.environ.get('DATA_DIR', 'data')
+DEFAULT_LANGUAGE = os.environ.get('LANGUAGE', 'Chinese')
+
+# 索引文件格式变化时递增，旧索引会被重建
+INDEX_VERSION = 2
+DAY_FILE_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})\.jsonl$')
+AI_FIELDS = ('tldr', 'motivation', 'method', 'result', 'conclusion')
+
+class PaperStore(ABC):
+    """RSS 服务使用的论文读取接口，返回的条目与 DatabaseManager 查询结果的格式相同。"""
+    name = None
+
+    @abstractmethod
+    def get_papers_between(self, start: str, end: str, category: Optional[str] = None) -> list:
+        """返回 [start, end] 日期区间内的论文，按日期倒序，每条带 published_date。"""
+
+    @abstractmethod
+    def iter_papers_between(self, start: str, end: str, category: Optional[str] = None,
+                            oldest_first: bool = False, like_patterns: Optional[list] = None) -> Iterator[dict]:
+        """逐条返回区间内的论文；like_patterns（见 keyword_like_patterns）只是预过滤，调用方仍需校验关键字。"""
+
+    @abstractmethod
+    def papers_version(self, start: str, end: str, category: Optional[str] = None) -> tuple:
+        """返回区间内论文的 (条数, 最大 updated_at)，数据变化时随之变化，不读取论文内容。"""
+
+class PostgresStore(PaperStore):
+    name = 'postgres'
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def get_papers_between(self, start, end, category=None):
+        return self.db_manager.get_papers_between(start, end, category)
+
+    def iter_papers_between(self, start, end, category=None, oldest_first=False, like_patterns=None):
+        return self.db_manager.iter_papers_between(start, end, category, oldest_first=oldest_first,
+                                                   like_patterns=like_patterns)
+
+    def papers_version(self, start, end, category=None):
+        return self.db_manager.get_papers_version(start, end, category)
+
+class JsonlIndex:
+    """单个只追加的 JSONL 文件的偏移索引。
+
+    records 为 {id: (起始偏移, 结束偏移, 索引时间)}，同一 id 以最后一行为准；
+    categories 为 {分类: {id: None}}（保持首次出现的顺序）。文件变大时只扫描新增部分，
+    变小（被重写）时重建；最后一行不完整时留到下次再索引。
+    """
+    def __init__(self, path: str):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.index_path = path + '.idx'
+        self.records = {}
+        self.categories = {}
+        self.size = 0
+        self.inode = None
+        self._mm = None
+        self._mapped_size = 0
+        self._lock = threading.Lock()
+        self._load_sidecar()
+
+    def _load_sidecar(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get('version') != INDEX_VERSION:
+            return
+        self.records = {k: tuple(v) for k, v in data['records'].items()}
+        self.categories = {k: dict.fromkeys(v) for k, v in data['categories'].items()}
+        self.size = data['size']
+        self.inode = data['inode']
+
+    def _save_sidecar(self):
+        data = {
+            'version': INDEX_VERSION, 'size': self.size, 'inode': self.inode,
+            'records': self.records, 'categories': {k: list(v) for k, v in self.categories.items()},
+        }
+        tmp_path = self.index_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            # 只读部署时只在内存中保留索引
+            self.logger.warning(f"无法写入索引文件 {self.index_path}: {e}")
+
+    def _map(self, size: int):
+        if self._mm is not None and self._mapped_size == size:
+            return
+        # 旧的映射可能仍在其他线程中读取，不主动关闭，随引用释放
+        self._mm = None
+        self._mapped_size = size
+        if size:
+            with open(self.path, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def refresh(self):
+        """与文件当前大小同步，需要时索引新增的行。"""
+        with self._lock:
+            stat = os.stat(self.path)
+            if stat.st_ino != self.inode:
+                # 定时任务发布时整体替换了文件，旧的索引和映射都已失效
+                self.records, self.categories, self.size = {}, {}, 0
+                self.inode, self._mm = stat.st_ino, None
+            if stat.st_size == self.size and self._mm is not None:
+                return
+            if stat.st_size < self.size:
+                self.records, self.categories, self.size = {}, {}, 0
+            self._map(stat.st_size)
+            if stat.st_size > self.size:
+                self._scan(stat.st_mtime)
+                self._save_sidecar()
+
+    def _scan(self, mtime: float):
+        mm, pos, end = self._mm, self.size, self._mapped_size
+        while pos < end:
+            newline = mm.find(b'\n', pos, end)
+            line_end = end if newline == -1 else newline
+            line = mm[pos:line_end]
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    if newline == -1:
+                        # 正在写入的最后一行，等写完后再索引
+                        break
+                    self.logger.warning(f"忽略 {self.path} 中无法解析的一行（偏移 {pos}）")
+                    record = None
+                if record and record.get('id'):
+                    self.records[record['id']] = (pos, line_end, mtime)
+                    for cat in record.get('categories') or []:
+                        self.categories.setdefault(cat, {})[record['id']] = None
+            pos = line_end + 1
+        self.size = min(pos, end)
+
+    def ids(self, category: Optional[str] = None) -> list:
+        if category is None:
+            return list(self.records)
+        return list(self.categories.get(category, ()))
+
+    def _read(self, paper_id: str) -> Optional[tuple]:
+        entry = self.records.get(paper_id)
+        if entry is None or self._mm is None:
+            return None
+        start, end, mtime = entry
+        try:
+            record = json.loads(self._mm[start:end])
+        except json.JSONDecodeError:
+            record = None
+        if not isinstance(record, dict) or record.get('id') != paper_id:
+            raise LookupError(paper_id)
+        return record, mtime
+
+    def read(self, paper_id: str) -> Optional[tuple]:
+        """返回 (记录, 索引时间)，只解析这一行。"""
+        try:
+            return self._read(paper_id)
+        except LookupError:
+            # 文件被重写后又追加到比索引更大，偏移已失效，重建索引
+            self.logger.warning(f"{self.path} 的索引已失效，重新建立")
+            with self._lock:
+                stat = os.stat(self.path)
+                self.records, self.categories, self.size = {}, {}, 0
+                self.inode, self._mm = stat.st_ino, None
+                self._map(stat.st_size)
+                self._scan(stat.st_mtime)
+                self._save_sidecar()
+            try:
+                return self._read(paper_id)
+            except LookupError:
+                return None
+
+class JsonlStore(PaperStore):
+    name = 'jsonl'
+
+    def __init__(self, data_dir: Optional[str] = None, language: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.data_dir = data_dir or DATA_DIR
+        self.language = language or DEFAULT_LANGUAGE
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _index(self, path: str) -> Optional[JsonlIndex]:
+        if not os.path.exists(path):
+            return None
+        with self._lock:
+            index = self._indexes.get(path)
+            if index is None:
+                index = self._indexes[path] = JsonlIndex(path)
+        index.refresh()
+        return index
+
+    def _dates_between(self, start: str, end: str) -> list:
+        """目录中 [start, end] 区间内有数据文件的日期，按日期倒序。"""
+        try:
+            names = os.listdir(self.data_dir)
+        except FileNotFoundError:
+            return []
+        dates = {m.group(1) for m in map(DAY_FILE_RE.match, names) if m}
+        dates |= {name[:10] for name in names if name.endswith(f'_AI_enhanced_{self.language}.jsonl')}
+        return sorted((d for d in dates if start <= d <= end), reverse=True)
+
+    @staticmethod
+    def _to_paper(record: dict, mtime: float, published: date) -> dict:
+        ai = record.get('AI') or {}
+        paper = {key: record.get(key) for key in ('id', 'categories', 'pdf', 'abs', 'authors', 'title',
+                                                  'comment', 'summary')}
+        paper['categories'] = paper['categories'] or []
+        paper['AI'] = {key: ai.get(key) for key in AI_FIELDS}
+        # 文件中没有写入时间，用索引该记录时文件的修改时间代替
+        paper['updated_at'] = datetime.fromtimestamp(mtime, timezone.utc)
+        paper['rss_fragment'] = None
+        paper['published_date'] = published
+        return paper
+
+    def _day_indexes(self, date_str: str) -> tuple:
+        """某一天的 (爬取文件索引, 增强文件索引)，文件不存在时为 None。"""
+        return (self._index(os.path.join(self.data_dir, f"{date_str}.jsonl")),
+                self._index(os.path.join(self.data_dir, f"{date_str}_AI_enhanced_{self.language}.jsonl")))
+
+    def _day_papers(self, date_str: str, category: Optional[str] = None) -> list:
+        """某一天的论文，按爬取顺序；已增强的论文使用增强后的记录。"""
+        raw, enhanced = self._day_indexes(date_str)
+        ids = list(dict.fromkeys((raw.ids(category) if raw else []) + (enhanced.ids(category) if enhanced else [])))
+        published = date.fromisoformat(date_str)
+        papers = []
+        for paper_id in ids:
+            found = (enhanced and enhanced.read(paper_id)) or (raw and raw.read(paper_id))
+            if not found:
+                continue
+            record, mtime = found
+            # 分类索引不会删除旧记录的分类，以记录本身为准
+            if category is not None and category not in (record.get('categories') or []):
+                continue
+            papers.append(self._to_paper(record, mtime, published))
+        return papers
+
+    def papers_version(self, start, end, category=None):
+        count, max_mtime = 0, None
+        for date_str in self._dates_between(start, end):
+            indexes = [index for index in self._day_indexes(date_str) if index]
+            ids = dict.fromkeys(pid for index in indexes for pid in index.ids(category))
+            count += len(ids)
+            mtimes = [index.records[pid][2] for index in indexes for pid in ids if pid in index.records]
+            if mtimes:
+                max_mtime = max(mtimes + ([max_mtime] if max_mtime is not None else []))
+        if max_mtime is None:
+            return count, None
+        return count, datetime.fromtimestamp(max_mtime, timezone.utc)
+
+    def get_papers_between(self, start, end, category=None):
+        papers = []
+        for date_str in self._dates_between(start, end):
+            papers.extend(self._day_papers(date_str, category))
+        self.logger.info(f"从 JSONL 文件获取 {len(papers)} 条数据，日期: {start} ~ {end}, 类别: {category}")
+        return papers
+
+    def iter_papers_between(self, start, end, category=None, oldest_first=False, like_patterns=None):
+        dates = self._dates_between(start, end)
+        if oldest_first:
+            dates.reverse()
+        for date_str in dates:
+            papers = self._day_papers(date_str, category)
+            yield from (reversed(papers) if oldest_first else papers)
+
+def get_store(db_manager=None) -> PaperStore:
+    """按 STORAGE_BACKEND 创建存储后端。"""
+    backend = STORAGE_BACKEND or ('postgres' if os.environ.get('DATABASE_URL') else 'jsonl')
+    if backend == 'jsonl':
+        return JsonlStore()
+    if backend == 'postgres':
+        if db_manager is None:
+            from api.database import DatabaseManager
+            db_manager = DatabaseManager()
+        return PostgresStore(db_manager)
+    raise ValueError(f"未知的存储后端: {backend}")
@@ -0,0 +1,165 @@
+"""arXiv 列表页（/list/<cat>/new）解析器的基准测试与正确性校验。
+
+对 fixtures 目录下保存的列表页（或命令行指定的 HTML 文件），分别用旧的基于
+CSS/XPath 查询的解析器和当前 ArxivSpider.parse 解析，两种模式（ids/full）下的
+输出必须完全一致，然后报告各自每秒解析的条目数。
+
+跨列表日子的页面可达数千条，--copies 会把页面中每一部分的条目重复多次
+（重新编号锚点）来模拟大页面。
+
+    python benchmarks/bench_listing_parser.py
+    python benchmarks/bench_listing_parser.py --copies 500 --repeat 5 saved_cs.CV.html
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('ARXIV_RSS_CATEGORIES', 'cs.CV,cs.CL')
+
+from scrapy.http import HtmlResponse
+
+from daily_arxiv.daily_arxiv.spiders.arxiv import ArxivSpider, _clean
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def legacy_parse_metadata(paper_dd):
+    meta = paper_dd.css("div.meta")
+    title = _clean(meta.css("div.list-title::text").getall())
+    summary = "\n".join(line.strip() for line in "".join(meta.css("p.mathjax ::text").getall()).strip().splitlines())
+    if not title or not summary:
+        return {}
+    authors = [_clean([a]) for a in meta.css("div.list-authors a::text").getall()]
+    comment = _clean(meta.css("div.list-comments ::text").getall())
+    comment = re.sub(r"^Comments:\s*", "", comment) or None
+    subjects = _clean(meta.css("div.list-subjects ::text").getall())
+    categories = list(dict.fromkeys(re.findall(r"\(([a-z\-]+(?:\.[A-Za-z\-]+)?)\)", subjects)))
+    return {"title": title, "authors": authors, "comment": comment, "summary": summary, "categories": categories}
+
+def legacy_parse(spider, response):
+    """改写前的解析器：每个条目多次 CSS/XPath 查询，dd 通过 following-sibling 查找。"""
+    anchors = []
+    for li in response.css("div[id=dlpage] ul li"):
+        href = li.css("a::attr(href)").get()
+        if href and "item" in href:
+            anchors.append(int(href.split("item")[-1]))
+    for paper in response.css("dl dt"):
+        paper_anchor = paper.css("a[name^='item']::attr(name)").get()
+        if not paper_anchor:
+            continue
+        paper_id = int(paper_anchor.split("item")[-1])
+        if anchors and paper_id >= anchors[-1]:
+            continue
+        abstract_link = paper.css("a[title='Abstract']::attr(href)").get()
+        if not abstract_link:
+            continue
+        arxiv_id = abstract_link.split("/")[-1]
+        paper_dd = paper.xpath("following-sibling::dd[1]")
+        if not paper_dd:
+            continue
+        subjects_text = paper_dd.css(".list-subjects .primary-subject::text").get()
+        if not subjects_text:
+            subjects_text = paper_dd.css(".list-subjects::text").get()
+        if subjects_text:
+            paper_categories = set(re.findall(r'\(([^)]+)\)', subjects_text))
+            if not paper_categories.intersection(spider.target_categories):
+                continue
+            item = {"id": arxiv_id, "categories": list(paper_categories)}
+        else:
+            item = {"id": arxiv_id, "categories": []}
+        if spider.mode == "full":
+            item.update(legacy_parse_metadata(paper_dd))
+        yield item
+
+def current_parse(spider, response):
+    return spider.parse(response)
+
+ENTRY_RE = re.compile(r"<dt>.*?</dd>", re.S)
+DL_RE = re.compile(r"<dl\b.*?</dl>", re.S)
+
+def scale_listing(html: str, copies: int) -> str:
+    """把每个 dl 中的条目重复 copies 次并重新编号 item 锚点，页首目录同步更新。"""
+    if copies <= 1:
+        return html
+    starts = []
+    counter = [0]
+
+    def renumber(entry):
+        counter[0] += 1
+        return re.sub(r"name='item\d+'", f"name='item{counter[0]}'", entry)
+
+    def expand(match):
+        block = match.group(0)
+        entries = ENTRY_RE.findall(block)
+        if not entries:
+            return block
+        starts.append(counter[0] + 1)
+        body = ''.join(renumber(e) for _ in range(copies) for e in entries)
+        head = block[:block.index(entries[0])]
+        tail = block[block.rindex(entries[-1]) + len(entries[-1]):]
+        return head + body + tail
+
+    html = DL_RE.sub(expand, html)
+    toc = iter(starts)
+
+    def retarget(match):
+        start = next(toc, None)
+        return match.group(0) if start is None else f"href=#item{start}"
+
+    return re.sub(r"href=#item\d+", retarget, html)
+
+def normalize(items):
+    # ids 模式下 categories 来自集合，顺序不固定
+    return [dict(item, categories=sorted(item["categories"])) if item.get("title") is None else item
+            for item in items]
+
+def build_response(body: bytes):
+    response = HtmlResponse(url="https://arxiv.org/list/cs.CV/new", body=body, encoding="utf-8")
+    response.selector  # 提前构建 HTML 树，两种解析器共用这部分开销，不计入解析耗时
+    return response
+
+def run(parser, spider, body: bytes, repeat: int):
+    best, items = None, None
+    for _ in range(repeat):
+        response = build_response(body)
+        start = time.perf_counter()
+        items = list(parser(spider, response))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, items
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="保存的列表页 HTML，默认使用 fixtures 目录下的全部文件")
+    parser.add_argument("--copies", type=int, default=300, help="每部分条目的重复次数")
+    parser.add_argument("--repeat", type=int, default=3, help="每种解析器的运行次数，取最快一次")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))
+    if not files:
+        sys.exit("没有找到列表页 HTML")
+    ok = True
+    for path in files:
+        html = scale_listing(open(path, encoding="utf-8").read(), args.copies)
+        body = html.encode("utf-8")
+        entries = html.count("<dt>")
+        start = time.perf_counter()
+        build_response(body)
+        print(f"{os.path.basename(path)}: {entries} 条目，{len(body) / 1024 / 1024:.1f} MB，"
+              f"构建 HTML 树 {time.perf_counter() - start:.3f}s")
+        for mode in ("ids", "full"):
+            spider = ArxivSpider(mode=mode)
+            legacy_time, legacy_items = run(legacy_parse, spider, body, args.repeat)
+            current_time, current_items = run(current_parse, spider, body, args.repeat)
+            same = normalize(legacy_items) == normalize(current_items)
+            ok = ok and same
+            print(f"  [{mode:4}] 输出 {len(current_items)} 篇，与旧解析器{'一致' if same else '不一致'}；"
+                  f"旧 {entries / legacy_time:,.0f} 条/秒，新 {entries / current_time:,.0f} 条/秒，"
+                  f"加速 {legacy_time / current_time:.1f}x")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""RSS 服务冷启动的基准测试。
+
+每次在新的子进程中导入 api.index（Vercel 的入口），记录导入耗时，再用 TestClient 依次请求
+给出的路径，记录每个请求的耗时（第一个请求包含首次连接数据库和检查迁移的开销）。
+
+同时检查导入后是否加载了只有爬取/AI增强才需要的重型模块（scrapy、twisted、openai 等），
+出现时视为回归；也可以用 --max-import 设定导入耗时上限。任一检查不通过时退出码为 1。
+
+    python benchmarks/bench_startup.py
+    DATABASE_URL=... python benchmarks/bench_startup.py --runs 10 --path / --path "/feed?day=1"
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# 服务的请求路径上不应加载的模块
+HEAVY_MODULES = ["scrapy", "twisted", "arxiv", "openai", "feedgen", "requests", "scheduler.index", "ai.enhance"]
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import api.index
+import_time = time.perf_counter() - start
+from fastapi.testclient import TestClient
+client = TestClient(api.index.app)
+timings = []
+for path in PATHS:
+    start = time.perf_counter()
+    status = client.get(path).status_code
+    timings.append((path, status, time.perf_counter() - start))
+loaded = [name for name in HEAVY if name in sys.modules]
+print(json.dumps({"import": import_time, "requests": timings, "loaded": loaded}))
+"""
+
+def run_once(paths: list) -> dict:
+    code = f"PATHS = {paths!r}\nHEAVY = {HEAVY_MODULES!r}\n" + CHILD
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"子进程失败:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="冷启动次数，报告中位数和最小值")
+    parser.add_argument("--path", action="append", help="依次请求的路径，可重复，默认为 / 和 /api-docs")
+    parser.add_argument("--max-import", type=float, help="导入耗时（中位数，秒）上限，超过时退出码为 1")
+    args = parser.parse_args()
+    paths = args.path or ["/", "/api-docs"]
+
+    runs = [run_once(paths) for _ in range(args.runs)]
+    imports = [r["import"] for r in runs]
+    print(f"导入 api.index：中位数 {statistics.median(imports) * 1000:.0f} ms，最小 {min(imports) * 1000:.0f} ms"
+          f"（{args.runs} 次）")
+    for i, path in enumerate(paths):
+        times = [r["requests"][i][2] for r in runs]
+        statuses = sorted({r["requests"][i][1] for r in runs})
+        label = "首个请求" if i == 0 else "后续请求"
+        print(f"{label} {path}：中位数 {statistics.median(times) * 1000:.0f} ms，最小 {min(times) * 1000:.0f} ms，"
+              f"状态码 {statuses}")
+
+    ok = True
+    loaded = sorted({name for r in runs for name in r["loaded"]})
+    if loaded:
+        ok = False
+        print(f"导入后加载了不应出现在请求路径上的模块: {', '.join(loaded)}")
+    if args.max_import is not None and statistics.median(imports) > args.max_import:
+        ok = False
+        print(f"导入耗时超过上限 {args.max_import:.2f}s")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
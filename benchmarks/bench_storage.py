@@ -0,0 +1,98 @@
+"""JSONL 存储后端的离线基准测试。
+
+用 data/ 下的样例文件生成若干天的 JSONL（每天的条目重复 --copies 次并改写 id），然后比较：
+
+    naive   每次查询都逐行解析当天的整个文件（没有索引时的做法）
+    cold    新建 JsonlStore 且没有 .idx 索引文件：首次查询需要扫描并建立索引
+    warm    新建 JsonlStore，从 .idx 加载索引（相当于服务进程重启后的首次查询）
+    hot     同一个 JsonlStore 的重复查询
+
+分别测试全部论文和单个分类的查询，并校验各方式返回的论文 id 一致。
+
+    python benchmarks/bench_storage.py
+    python benchmarks/bench_storage.py --days 30 --copies 10 --category cs.CV
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.storage import JsonlStore
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+def generate(target: str, days: int, copies: int, language: str) -> list:
+    """把样例文件复制成最近 days 天的数据，返回日期列表（倒序）。"""
+    raw = open(sorted(glob.glob(os.path.join(DATA_DIR, '????-??-??.jsonl')))[0], encoding='utf-8').read().splitlines()
+    enhanced = open(sorted(glob.glob(os.path.join(DATA_DIR, f'*_AI_enhanced_{language}.jsonl')))[0],
+                    encoding='utf-8').read().splitlines()
+    dates = [(date(2025, 7, 1) - timedelta(days=i)).isoformat() for i in range(days)]
+    for n, date_str in enumerate(dates):
+        for lines, name in ((raw, f"{date_str}.jsonl"), (enhanced, f"{date_str}_AI_enhanced_{language}.jsonl")):
+            with open(os.path.join(target, name), 'w', encoding='utf-8') as f:
+                for copy in range(copies):
+                    for line in lines:
+                        record = json.loads(line)
+                        record['id'] = f"{record['id']}-{n}-{copy}"
+                        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    return dates
+
+def naive_query(target: str, dates: list, category, language: str) -> list:
+    ids = []
+    for date_str in dates:
+        records = {}
+        for name in (f"{date_str}.jsonl", f"{date_str}_AI_enhanced_{language}.jsonl"):
+            with open(os.path.join(target, name), encoding='utf-8') as f:
+                for line in f:
+                    # 同一 id 以后出现的行为准，增强文件在后
+                    record = json.loads(line)
+                    records[record['id']] = record
+        ids.extend(pid for pid, r in records.items() if category is None or category in (r.get('categories') or []))
+    return ids
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--copies", type=int, default=5, help="每天的条目重复次数")
+    parser.add_argument("--category", default="cs.CV")
+    parser.add_argument("--language", default="Chinese")
+    args = parser.parse_args()
+
+    target = tempfile.mkdtemp(prefix="bench_storage_")
+    try:
+        dates = generate(target, args.days, args.copies, args.language)
+        size = sum(os.path.getsize(p) for p in glob.glob(os.path.join(target, '*.jsonl')))
+        print(f"{args.days} 天，{len(glob.glob(os.path.join(target, '*.jsonl')))} 个文件，{size / 1024 / 1024:.1f} MB")
+        start, end = dates[-1], dates[0]
+        ok = True
+        for category in (None, args.category):
+            label = category or "全部"
+            naive_time, expected = timed(lambda: naive_query(target, dates, category, args.language))
+            for idx in glob.glob(os.path.join(target, '*.idx')):
+                os.remove(idx)
+            cold_time, cold = timed(lambda: JsonlStore(target, args.language).get_papers_between(start, end, category))
+            store = JsonlStore(target, args.language)
+            warm_time, warm = timed(lambda: store.get_papers_between(start, end, category))
+            hot_time, hot = timed(lambda: store.get_papers_between(start, end, category))
+            same = all([p['id'] for p in result] == expected for result in (cold, warm, hot))
+            ok = ok and same
+            print(f"[{label}] {len(expected)} 篇，结果{'一致' if same else '不一致'}；naive {naive_time * 1000:.0f} ms，"
+                  f"cold {cold_time * 1000:.0f} ms，warm {warm_time * 1000:.0f} ms，hot {hot_time * 1000:.0f} ms")
+    finally:
+        shutil.rmtree(target)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
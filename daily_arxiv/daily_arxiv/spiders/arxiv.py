@@ -2,10 +2,32 @@ import scrapy
 import os
 import re
 
+CATEGORY_RE = re.compile(r"\(([a-z\-]+(?:\.[A-Za-z\-]+)?)\)")
+
+
+def _clean(texts):
+    # 拼接节点下的全部文本并合并空白
+    return " ".join("".join(texts).split())
+
+
+def _own_text(node):
+    # 节点自身的文本（不含子元素内部的文本），相当于 CSS 的 ::text
+    texts = [node.text] if node.text else []
+    texts.extend(child.tail for child in node if child.tail)
+    return texts
+
+
+def _classes(node):
+    # 注释等非元素节点的 get 返回 None
+    return (node.get("class") or "").split() if isinstance(node.tag, str) else []
+
 
 class ArxivSpider(scrapy.Spider):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, mode=None, **kwargs):
         super().__init__(*args, **kwargs)
+        # full: 直接从列表页提取标题、作者、备注、摘要和全部分类，无需再调用 arXiv API
+        # ids:  只提取 id 和主分类，详细信息由后续阶段获取
+        self.mode = mode or os.environ.get("ARXIV_SPIDER_MODE", "full")
         categories = os.environ.get("ARXIV_RSS_CATEGORIES")
         categories = categories.split(",")
         # 保存目标分类列表，用于后续验证
@@ -18,57 +40,119 @@ class ArxivSpider(scrapy.Spider):
     allowed_domains = ["arxiv.org"]  # 允许爬取的域名
 
     def parse(self, response):
-        # 提取每篇论文的信息
+        # 页首目录中各部分（新提交、交叉列表、替换）的起始编号，最后一部分（替换）不抓取
         anchors = []
         for li in response.css("div[id=dlpage] ul li"):
             href = li.css("a::attr(href)").get()
             if href and "item" in href:
                 anchors.append(int(href.split("item")[-1]))
+        cutoff = anchors[-1] if anchors else None
+
+        # 按文档顺序把每个 dt 与其后的 dd 配对，整页只遍历一次
+        for dl in response.selector.root.iter("dl"):
+            paper_dt = None
+            for node in dl:
+                if node.tag == "dt":
+                    paper_dt = node
+                elif node.tag == "dd" and paper_dt is not None:
+                    item = self.parse_entry(paper_dt, node, cutoff)
+                    paper_dt = None
+                    if item is not None:
+                        yield item
+
+    def parse_entry(self, paper_dt, paper_dd, cutoff=None):
+        """解析一对 dt/dd，不属于目标范围时返回 None。"""
+        paper_anchor = abstract_link = None
+        for a in paper_dt.iter("a"):
+            name = a.get("name")
+            if paper_anchor is None and name and name.startswith("item"):
+                paper_anchor = name
+            if abstract_link is None and a.get("title") == "Abstract":
+                abstract_link = a.get("href")
+        if not paper_anchor:
+            return None
+        paper_id = int(paper_anchor.split("item")[-1])
+        if cutoff is not None and paper_id >= cutoff:
+            return None
+        # 获取论文ID
+        if not abstract_link:
+            return None
+        arxiv_id = abstract_link.split("/")[-1]
+
+        fields = self._collect_fields(paper_dd, full=self.mode == "full")
+        # 提取论文分类信息 - 优先使用主分类，例如 "Computer Vision and Pattern Recognition (cs.CV)"
+        subjects_text = fields["primary"] or fields["subjects_own"]
+        if subjects_text:
+            # 检查论文分类是否与目标分类有交集
+            paper_categories = set(re.findall(r'\(([^)]+)\)', subjects_text))
+            if not paper_categories.intersection(self.target_categories):
+                return None
+            item = {
+                "id": arxiv_id,
+                "categories": list(paper_categories),  # 添加分类信息用于调试
+            }
+        else:
+            # 如果无法获取分类信息仍然返回论文（保持向后兼容）
+            item = {
+                "id": arxiv_id,
+                "categories": [],
+            }
+        if self.mode == "full":
+            item.update(self.parse_metadata(fields))
+        return item
+
+    @staticmethod
+    def _collect_fields(paper_dd, full=True):
+        """遍历 div.meta 的直接子元素一次，收集各字段的原始文本；full 为 False 时只取分类。"""
+        fields = {"title": None, "authors": [], "comment": None, "subjects": None,
+                  "subjects_own": None, "primary": None, "summary": []}
+        containers = [node for node in paper_dd if "meta" in _classes(node)] or [paper_dd]
+        for container in containers:
+            for node in container:
+                classes = _classes(node)
+                if "list-subjects" in classes:
+                    if fields["subjects"] is not None:
+                        continue
+                    own = _own_text(node)
+                    fields["subjects_own"] = own[0] if own else None
+                    for span in node.iter("span"):
+                        if "primary-subject" in _classes(span) and span.text:
+                            fields["primary"] = span.text
+                            break
+                    fields["subjects"] = list(node.itertext()) if full else []
+                elif not full:
+                    continue
+                elif "list-title" in classes and fields["title"] is None:
+                    fields["title"] = _own_text(node)
+                elif "list-authors" in classes:
+                    fields["authors"].extend(a.text for a in node.iter("a") if a.text)
+                elif "list-comments" in classes and fields["comment"] is None:
+                    fields["comment"] = list(node.itertext())
+                elif node.tag == "p" and "mathjax" in classes:
+                    fields["summary"].extend(node.itertext())
+        return fields
+
+    @staticmethod
+    def parse_metadata(fields):
+        """从 dd 中收集的字段得到与 arXiv API 相同字段的论文信息。
 
-        # 遍历每篇论文的详细信息
-        for paper in response.css("dl dt"):
-            paper_anchor = paper.css("a[name^='item']::attr(name)").get()
-            if not paper_anchor:
-                continue
-                
-            paper_id = int(paper_anchor.split("item")[-1])
-            if anchors and paper_id >= anchors[-1]:
-                continue
-
-            # 获取论文ID
-            abstract_link = paper.css("a[title='Abstract']::attr(href)").get()
-            if not abstract_link:
-                continue
-                
-            arxiv_id = abstract_link.split("/")[-1]
-            
-            # 获取对应的论文描述部分 (dd元素)
-            paper_dd = paper.xpath("following-sibling::dd[1]")
-            if not paper_dd:
-                continue
-            
-            # 提取论文分类信息 - 在subjects部分
-            subjects_text = paper_dd.css(".list-subjects .primary-subject::text").get()
-            if not subjects_text:
-                # 如果找不到主分类，尝试其他方式获取分类
-                subjects_text = paper_dd.css(".list-subjects::text").get()
-            
-            if subjects_text:
-                # 解析分类信息，通常格式如 "Computer Vision and Pattern Recognition (cs.CV)"
-                # 提取括号中的分类代码
-                categories_in_paper = re.findall(r'\(([^)]+)\)', subjects_text)
-                
-                # 检查论文分类是否与目标分类有交集
-                paper_categories = set(categories_in_paper)
-                if paper_categories.intersection(self.target_categories):
-                    yield {
-                        "id": arxiv_id,
-                        "categories": list(paper_categories),  # 添加分类信息用于调试
-                    }
-            else:
-                # 如果无法获取分类信息，记录警告但仍然返回论文（保持向后兼容）
-                # self.logger.warning(f"Could not extract categories for paper {arxiv_id}, including anyway")
-                yield {
-                    "id": arxiv_id,
-                    "categories": [],
-                }
+        缺少标题或摘要时返回空字典，由详情阶段通过 API 补全。
+        """
+        title = _clean(fields["title"] or [])
+        # 保留摘要原有的换行（与 API 返回的一致），去掉每行的缩进
+        summary = "\n".join(line.strip() for line in "".join(fields["summary"]).strip().splitlines())
+        if not title or not summary:
+            return {}
+        authors = [_clean([a]) for a in fields["authors"]]
+        comment = _clean(fields["comment"] or [])
+        comment = re.sub(r"^Comments:\s*", "", comment) or None
+        # 与 API 一致：主分类在前，包含全部交叉分类
+        subjects = _clean(fields["subjects"] or [])
+        categories = list(dict.fromkeys(CATEGORY_RE.findall(subjects)))
+        return {
+            "title": title,
+            "authors": authors,
+            "comment": comment,
+            "summary": summary,
+            "categories": categories,
+        }
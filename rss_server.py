@@ -1,29 +1,67 @@
 import os
 import json
+import hashlib
 from collections import defaultdict
 from datetime import datetime, timedelta, timezone
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import Response
-from feedgen.feed import FeedGenerator
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from typing import Optional
 from functools import lru_cache
-from scheduler.index import DailyArXivProcessor
-from api.database import DatabaseManager
-from utils.cache import memory_cache # 从新文件导入缓存实例
+from api.database import DatabaseManager, close_pools
+from api.storage import get_store
+from utils.cache import Cache, memory_cache # 从新文件导入缓存实例
+from utils.ledger import Ledger
+from utils.index import DayIndex, is_valid_keyword, keyword_like_patterns, matches_keywords
+from utils.feed import (assemble_feed, choose_encoding, compress_variants, feed_footer, feed_header,
+                        render_item_fragment)
+from ai.worker import EnhancementWorkerPool, needs_enhancement
 from ai.movie_daily import generate_movie_rss, router as movie_router
 
 # 从环境变量获取配置，便于Vercel部署
 DATA_DIR = os.environ.get('DATA_DIR', 'data')
 DEFAULT_LANGUAGE = os.environ.get('LANGUAGE', 'Chinese')
+# 缓存有效期（秒）：当天数据和空结果可能很快变化，已封存的历史日期可以长期缓存
+CACHE_TTL_TODAY = int(os.environ.get('CACHE_TTL_TODAY', '300'))
+CACHE_TTL_EMPTY = int(os.environ.get('CACHE_TTL_EMPTY', '60'))
+CACHE_TTL_SEALED = int(os.environ.get('CACHE_TTL_SEALED', '86400'))
+BEIJING_TZ = timezone(timedelta(hours=8))
+# 设为 0 时输出紧凑（不缩进）的XML
+FEED_PRETTY = os.environ.get('FEED_PRETTY', '1') != '0'
+# 允许请求的最大天数，以及超过多少天时自动改为流式输出
+FEED_MAX_DAYS = int(os.environ.get('FEED_MAX_DAYS', '90'))
+FEED_STREAM_MIN_DAYS = int(os.environ.get('FEED_STREAM_MIN_DAYS', '31'))
+# 流式输出时每次发送的大致字节数
+FEED_STREAM_CHUNK_SIZE = 64 * 1024
+
+# 渲染好的RSS按数据版本缓存，数据不变时直接复用
+feed_cache = Cache(
+    max_entries=int(os.environ.get('FEED_CACHE_MAX_ENTRIES', '256')),
+    max_bytes=int(os.environ.get('FEED_CACHE_MAX_MB', '256')) * 1024 * 1024,
+)
 
 app = FastAPI(title="arXiv RSS API", 
               description="提供arXiv论文的RSS订阅服务", 
               version="1.0.0")
 
+# 表结构在第一次访问数据库时创建或升级（见 DatabaseManager.ensure_schema），导入时不连接数据库
 db_manager = DatabaseManager()
+# 论文的读取来源（Postgres 或本地 JSONL 文件），由 STORAGE_BACKEND 决定
+store = get_store(db_manager)
+
+enhance_ledger = Ledger('enhance', db_manager)
+enhance_workers = EnhancementWorkerPool(db_manager, on_done=lambda dates: invalidate_days(dates))
+
+@app.on_event("startup")
+def start_enhance_workers():
+    # 服务启动时开始处理后台AI增强队列（含上次未完成的任务）
+    enhance_workers.start()
 
-# 确保数据库表自动创建
-DatabaseManager().connect_and_create_table()
+@app.on_event("shutdown")
+def shutdown_db_pool():
+    enhance_workers.stop()
+    # 服务关闭时归还并关闭共享连接池
+    close_pools()
 
 # 获取可用分类
 @lru_cache(maxsize=1)
@@ -43,188 +81,315 @@ def format_rss_time(dt_str):
     # 添加UTC时区信息
     return dt.replace(tzinfo=timezone.utc)
 
-def build_description(item):
-    # Extract data
-    ai = item.get('AI', {})
-    title = str(item.get('title', 'Untitled'))
-
-    authors_list = item.get('authors')
-    authors = '; '.join(str(a) for a in authors_list) if authors_list else 'Anonymous'
-
-    categories_list = item.get('categories')
-    categories = ' | '.join(str(c) for c in categories_list) if categories_list else ''
-    
-    # Build description with simple tags
-    description = [
-        f"<b>Title:</b> &nbsp;{title}<br>",
-        f"<b>Authors:</b>&nbsp; {authors}<br>",
-        f"<b>Categories:</b> &nbsp;{categories}<br>" if categories else "",
-        "<br>",
-        "<b>Research Motivation:</b>&nbsp;",
-        str(ai.get('motivation', 'Not provided')) + "<br>",
-        "<br>",
-        "<b>Methodology:</b>&nbsp;",
-        str(ai.get('method', 'Not described')) + "<br>",
-        "<br>",
-        "<b>Key Results:</b>&nbsp;",
-        str(ai.get('result', 'Not available')) + "<br>",
-        "<br>",
-        "<b>Conclusions:</b>&nbsp;",
-        str(ai.get('conclusion', 'None drawn')) + "<br>",
-        "<br>",
-        "<b>Abstract:</b>&nbsp;",
-        str(item.get('summary', 'No abstract available')) + "<br>"
-    ]
-    
-    # Add comment if exists
-    comment_text = item.get('comment')
-    if comment_text is not None:
-        description.extend([
-            "<br>",
-            "<b>Editorial Note:</b>&nbsp;",
-            str(comment_text) + "<br>"
-        ])
-    
-    pdf_url = str(item.get('pdf', ''))
-    if pdf_url:
-        description.extend([
-            "<br>",
-            "<b>Resources:</b>&nbsp;",
-            f'<a href="{pdf_url}">PDF</a>'
-        ])
-    
-    # Join and remove empty lines
-    return ''.join(filter(None, description))
+def item_fragment(item: dict) -> str:
+    # 优先使用入库时预渲染的片段，缺失时渲染一次并挂在缓存的条目上
+    fragment = item.get('rss_fragment')
+    if fragment is None:
+        fragment = render_item_fragment(item) or ''
+        item['rss_fragment'] = fragment
+    return fragment
 
-def load_items(date_str: str, category: Optional[str] = None) -> list:
-    # 尝试从缓存中获取数据
-    cached_items = memory_cache.get(date_str)
-    if cached_items is not None:
-        return cached_items
+def enqueue_missing(items: list):
+    # 缺少AI字段的条目交给后台队列增强，本次请求直接返回标题和摘要
+    pending = [item['id'] for item in items if item.get('id') and needs_enhancement(item)]
+    if not pending or not db_manager.conn_string:
+        return
+    # 已放弃或尚未到重试时间的条目不入队，避免坏数据在每次请求时被反复重试
+    pending = enhance_ledger.due(pending)
+    if pending and db_manager.enqueue_enhancement(pending):
+        enhance_workers.wake()
+
+def invalidate_days(dates: set):
+    # 后台增强写回数据库后，让对应日期的缓存失效，下次请求重新读取
+    for date_str in dates:
+        memory_cache.delete(papers_cache_key(date_str))
 
-    # 如果缓存中没有，则从数据库获取
-    items = db_manager.get_papers_by_date(date_str, category)
+def papers_cache_key(date_str: str, category: Optional[str] = None):
+    return ('papers', date_str, category)
+
+def papers_cache_ttl(date_str: str, items: list) -> int:
     if not items:
-        # 如果数据库中没有数据，也将其缓存为空列表以避免重复查询
-        memory_cache.set(date_str, [])
-        return []
+        return CACHE_TTL_EMPTY
+    # 仍有条目等待后台增强时按当天处理，其他实例也能较快看到增强结果；
+    # 台账已放弃的条目不会再被增强，不影响封存
+    pending = {item['id'] for item in items if item.get('id') and needs_enhancement(item)}
+    if pending and pending - enhance_ledger.abandoned(list(pending)):
+        return CACHE_TTL_TODAY
+    # 服务器本地日期与北京时间日期取较早者，此后的日期都视为仍在更新
+    today = min(datetime.now().strftime('%Y-%m-%d'), datetime.now(BEIJING_TZ).strftime('%Y-%m-%d'))
+    if date_str >= today:
+        return CACHE_TTL_TODAY
+    return CACHE_TTL_SEALED
 
-    # 检查哪些条目没有AI数据
-    need_enhance = []
-    for item in items:
-        ai = item.get('AI', {})
-        # 判断AI字段是否全为空或全为None
-        if not ai or all(v is None or v == '' for v in ai.values()):
-            need_enhance.append(item)
-    # 如果有需要增强的条目，进行AI增强并更新数据库和缓存
-    if need_enhance:
-        from ai.enhance import run_enhancement_process
-        enhanced = run_enhancement_process(need_enhance)
-        # 用增强后的数据替换原有条目
-        id2enh = {d['id']: d for d in enhanced}
-        for idx, item in enumerate(items):
-            if item['id'] in id2enh:
-                items[idx] = id2enh[item['id']]
-        # 更新数据库
-        db_manager.insert_data(enhanced)
-        # 更新缓存
-        memory_cache.set(date_str, items)
-    else:
-        # 将获取的数据存入缓存
-        memory_cache.set(date_str, items)
-    return items
+def date_runs(dates: list) -> list:
+    """把日期合并成连续的区间，返回 [(起始日期, 结束日期)]，按日期升序。"""
+    runs = []
+    for date_str in sorted(set(dates)):
+        current = datetime.strptime(date_str, '%Y-%m-%d')
+        if runs and current - datetime.strptime(runs[-1][1], '%Y-%m-%d') == timedelta(days=1):
+            runs[-1][1] = date_str
+        else:
+            runs.append([date_str, date_str])
+    return [tuple(run) for run in runs]
+
+def load_days(dates: list) -> list:
+    """按天返回 DayIndex，未命中缓存的日期按连续区间合并查询。"""
+    by_date = {}
+    missing = []
+    for date_str in dates:
+        cached_day = memory_cache.get(papers_cache_key(date_str))
+        if cached_day is None:
+            missing.append(date_str)
+        else:
+            by_date[date_str] = cached_day
+
+    if missing:
+        grouped = defaultdict(list)
+        # 每个连续区间查询一次，不会重新读取夹在中间、已在缓存中的日期
+        for start, end in date_runs(missing):
+            for item in store.get_papers_between(start, end):
+                grouped[item.pop('published_date').strftime('%Y-%m-%d')].append(item)
+        for date_str in missing:
+            # 空的日期也缓存下来
+            items = grouped.get(date_str, [])
+            enqueue_missing(items)
+            day = DayIndex(date_str, items, get_allowed_categories())
+            memory_cache.set(papers_cache_key(date_str), day, ttl=papers_cache_ttl(date_str, items))
+            by_date[date_str] = day
+    return [by_date[date_str] for date_str in dates]
+
+def load_items(date_str: str, category: Optional[str] = None) -> list:
+    return load_days([date_str])[0].items_for(category)
 
 def get_recent_dates(n=30):
     today = datetime.now()
     return [(today - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(n)]
 
-def load_items_multi(dates):
+def unique_items(days: list, category: Optional[str] = None) -> list:
+    # 分类源只遍历各天对应分类桶中的条目
     all_items = []
     seen_ids = set()
-    for date_str in dates:
-        # 从数据库/缓存获取数据
-        items = load_items(date_str)
-        for item in items:
+    for day in days:
+        for item in day.items_for(category):
             pid = item.get('id')
             if pid and pid not in seen_ids:
                 all_items.append(item)
                 seen_ids.add(pid)
     return all_items
 
-@lru_cache(maxsize=128)
-def generate_rss_xml(cat: Optional[str], day: int, keys: Optional[str] = None):
-    dates = get_recent_dates(day)
-    items = load_items_multi(dates)
-        
-    # 根据关键字过滤
-    if keys:
-        keywords = [k.strip().lower() for k in keys.split(',') if k.strip()]
-        if keywords:
-            items = [item for item in items if 
-                     item.get('summary') and any(keyword in item['summary'].lower() for keyword in keywords)]
-
-    if not items: # 如果没有获取到任何项目，抛出HTTP 404
-        raise HTTPException(status_code=404, detail=f'未找到最近{day}天的论文。')
-
-    fg = FeedGenerator()
+def load_items_multi(dates):
+    return unique_items(load_days(dates))
+
+def parse_keywords(keys: Optional[str]) -> list:
+    if not keys:
+        return []
+    keywords = [k.strip().lower() for k in keys.split(',') if k.strip()]
+    invalid = [k for k in keywords if not is_valid_keyword(k)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"关键字过短或不含字母数字: {', '.join(invalid)}")
+    return keywords
+
+def feed_channel(cat: Optional[str]) -> tuple:
     if cat is None:
-        fg.title(f'arXiv 每日论文')
-        fg.link(href=f'/feed', rel='self')
-        fg.description(f'arXiv 每日论文总源')
-        feed_items = items
-    else:
-        fg.title(f'arXiv 每日论文（{cat}）')
-        fg.link(href=f'/feed/{cat}', rel='self')
-        fg.description(f'arXiv 每日论文分类源：{cat}')
-        feed_items = []
-        for item in items:
-            cats = item.get('categories')
-            if cats and isinstance(cats, list) and cat in cats:
-                feed_items.append(item)
-    
-    # 如果指定了类别但没有找到相关项目，也应该抛出404
-    if cat is not None and not feed_items:
-        raise HTTPException(status_code=404, detail=f'未找到分类 {cat} 的论文。')
-
-    for item in feed_items:
-        fe = fg.add_entry()
-        ai = item.get('AI', {})
-        zh = ai.get('tldr')
-        title = item.get('title')
-        if not title:
+        return 'arXiv 每日论文', '/feed', 'arXiv 每日论文总源'
+    return f'arXiv 每日论文（{cat}）', f'/feed/{cat}', f'arXiv 每日论文分类源：{cat}'
+
+def feed_not_found(cat: Optional[str], day: int) -> HTTPException:
+    if cat is not None:
+        return HTTPException(status_code=404, detail=f'未找到分类 {cat} 的论文。')
+    return HTTPException(status_code=404, detail=f'未找到最近{day}天的论文。')
+
+def feed_unavailable(e: Exception) -> HTTPException:
+    # 存储后端暂时不可用，客户端可以稍后重试
+    return HTTPException(status_code=503, detail=f"读取论文失败: {e}")
+
+def render_rss_xml(cat: Optional[str], day: int, feed_items: list, last_modified: datetime) -> bytes:
+    # 如果没有获取到任何项目，抛出HTTP 404
+    if not feed_items:
+        raise feed_not_found(cat, day)
+
+    title, link, description = feed_channel(cat)
+
+    # 构建时间取数据的最后修改时间，保证同一数据版本的输出完全一致
+    header = feed_header(title, link, description, last_modified, pretty=FEED_PRETTY)
+    # 与原先 feedgen 的 prepend 顺序保持一致
+    fragments = (item_fragment(item) for item in reversed(feed_items))
+    return assemble_feed(header, fragments, pretty=FEED_PRETTY)
+
+class RenderedFeed:
+    def __init__(self, body: bytes, etag: str, last_modified: datetime):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        # 压缩版本随渲染结果一起缓存，响应时不再重复压缩
+        self.variants = compress_variants(body)
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        # 不同编码的字节不同，强 ETag 也必须不同
+        if encoding is None:
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+    def content_for(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        return self.variants[encoding]
+
+def feed_version(cat: Optional[str], day: int, keys: Optional[str], dates: list, items: list) -> tuple:
+    # 数据版本由日期窗口、条目数和最大 updated_at 决定，任一变化都会生成新的RSS
+    max_updated = max((item['updated_at'] for item in items if item.get('updated_at')), default=None)
+    return ('feed', cat, day, keys, dates[-1], dates[0], len(items), max_updated)
+
+def build_feed(cat: Optional[str], day: int, keys: Optional[str] = None) -> RenderedFeed:
+    dates = get_recent_dates(day)
+    days = load_days(dates)
+    items = unique_items(days, cat)
+    version = feed_version(cat, day, keys, dates, items)
+    feed = feed_cache.get(version)
+    if feed is not None:
+        return feed
+
+    last_modified = version[-1] or datetime.now(timezone.utc)
+    last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+    # 根据关键字过滤：在每天的倒排索引上查询后合并
+    keywords = parse_keywords(keys)
+    if keywords:
+        hits = set().union(*(d.keywords.search(keywords) for d in days))
+        items = [item for item in items if item.get('id') in hits]
+    body = render_rss_xml(cat, day, items, last_modified)
+    etag = '"' + hashlib.sha256(repr((version, FEED_PRETTY)).encode('utf-8')).hexdigest()[:32] + '"'
+    feed = RenderedFeed(body, etag, last_modified)
+    feed_cache.set(version, feed)
+    return feed
+
+def generate_rss_xml(cat: Optional[str], day: int, keys: Optional[str] = None) -> bytes:
+    return build_feed(cat, day, keys).body
+
+class StreamedFeed:
+    """流式RSS的数据版本：条数和最大 updated_at 由存储后端汇总得到，不读取论文内容。"""
+    def __init__(self, cat: Optional[str], day: int, keys: Optional[str]):
+        self.dates = get_recent_dates(day)
+        try:
+            count, max_updated = store.papers_version(self.dates[-1], self.dates[0], cat)
+        except Exception as e:
+            raise feed_unavailable(e)
+        version = ('stream', cat, day, keys, self.dates[-1], self.dates[0], count, max_updated)
+        last_modified = max_updated or datetime.now(timezone.utc)
+        self.last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+        self.etag = '"' + hashlib.sha256(repr((version, FEED_PRETTY)).encode('utf-8')).hexdigest()[:32] + '"'
+
+def stream_fragments(cat: Optional[str], dates: list, keys: Optional[str] = None):
+    keywords = parse_keywords(keys)
+    sep = '\n' if FEED_PRETTY else ''
+    # 关键字先在数据库端用 LIKE 预过滤（JSONL 后端不做预过滤），再按与倒排索引相同的语义校验
+    patterns = keyword_like_patterns(keywords)
+    for item in store.iter_papers_between(dates[-1], dates[0], cat, oldest_first=True, like_patterns=patterns):
+        if keywords and not matches_keywords(item, keywords):
             continue
-        if not zh:
-            zh = '\n'.join([f"{k}: {v}" for k, v in ai.items()])
-        fe.title(zh if zh else item.get('title', ''))
-        fe.link(href=item.get('abs', ''))
-        fe.description(build_description(item))
-        fe.author({'name': ', '.join(str(a) for a in item.get('authors', []))})
-        if 'categories' in item and isinstance(item['categories'], list):
-            for c in item['categories']:
-                fe.category(term=str(c))
-        published_date = item.get('updated_at')
-        if published_date:
-            utc_published_date = published_date.astimezone(timezone.utc)
-            fe.pubDate(utc_published_date)
-        fe.guid(item.get('id', ''))
-    return fg.rss_str(pretty=True)
+        fragment = item.get('rss_fragment') or render_item_fragment(item)
+        if fragment:
+            yield (fragment + sep).encode('utf-8')
+
+def stream_rss_xml(cat: Optional[str], day: int, keys: Optional[str] = None, feed: Optional[StreamedFeed] = None):
+    """边从存储后端（数据库或 JSONL 文件）读取边输出RSS，峰值内存与天数无关。
+
+    条目直接来自存储后端，不经过按天缓存，也不会把缺少AI字段的条目加入增强队列。
+    返回前先读取第一条，没有任何条目时与非流式输出一样抛出 404，读取失败时抛出 503；
+    开始输出后再出错则异常继续向上抛出，中断响应，而不是输出被截断的RSS。
+    """
+    feed = feed or StreamedFeed(cat, day, keys)
+    fragments = stream_fragments(cat, feed.dates, keys)
+    try:
+        first = next(fragments, None)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise feed_unavailable(e)
+    if first is None:
+        raise feed_not_found(cat, day)
+    title, link, description = feed_channel(cat)
+    header = feed_header(title, link, description, feed.last_modified, pretty=FEED_PRETTY)
+
+    def body():
+        yield header.encode('utf-8')
+        chunk, size = [first], len(first)
+        for data in fragments:
+            chunk.append(data)
+            size += len(data)
+            if size >= FEED_STREAM_CHUNK_SIZE:
+                yield b''.join(chunk)
+                chunk, size = [], 0
+        chunk.append(feed_footer(FEED_PRETTY).encode('utf-8'))
+        yield b''.join(chunk)
+    return body()
+
+def is_not_modified(request: Request, etags: set, last_modified: datetime) -> bool:
+    # If-None-Match 优先于 If-Modified-Since（RFC 9110）
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(',')]
+        return '*' in tags or any(t.removeprefix('W/') in etags for t in tags)
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
 
 @app.get('/feed', summary="获取统一的RSS源（按天或按分类）", response_description="RSS XML内容")
-def rss_unified(day: int = Query(1, description="获取最近的天数"), 
+def rss_unified(request: Request,
+                day: int = Query(1, ge=1, description="获取最近的天数"), 
                 cat: Optional[str] = Query(None, description="按分类筛选"),
-                keys: Optional[str] = Query(None, description="按关键字过滤摘要")):
+                keys: Optional[str] = Query(None, description="按关键字过滤摘要"),
+                stream: Optional[bool] = Query(None, description="是否流式输出，默认在天数较大时自动开启")):
     allowed_categories = get_allowed_categories()
     if cat and cat not in allowed_categories:
         raise HTTPException(status_code=404, detail=f"不支持的分类: {cat}. 可用分类: {', '.join(allowed_categories) if allowed_categories else '无'}")
+    if day > FEED_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"天数不能超过 {FEED_MAX_DAYS}")
+    if stream is None:
+        stream = day >= FEED_STREAM_MIN_DAYS
     try:
-        xml = generate_rss_xml(cat, day, keys)
-        return Response(content=xml, media_type="application/xml")
+        if stream:
+            feed = StreamedFeed(cat, day, keys)
+            headers = {'ETag': feed.etag, 'Last-Modified': format_datetime(feed.last_modified, usegmt=True)}
+            if is_not_modified(request, {feed.etag}, feed.last_modified):
+                return Response(status_code=304, headers=headers)
+            return StreamingResponse(stream_rss_xml(cat, day, keys, feed), media_type="application/xml",
+                                     headers=headers)
+        feed = build_feed(cat, day, keys)
+        encoding = choose_encoding(request.headers.get('accept-encoding'), feed.variants)
+        headers = {
+            'ETag': feed.etag_for(encoding),
+            'Last-Modified': format_datetime(feed.last_modified, usegmt=True),
+            'Vary': 'Accept-Encoding',
+        }
+        etags = {feed.etag_for(None)} | {feed.etag_for(e) for e in feed.variants}
+        if is_not_modified(request, etags, feed.last_modified):
+            return Response(status_code=304, headers=headers)
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        return Response(content=feed.content_for(encoding), media_type="application/xml", headers=headers)
     except HTTPException as e:
         raise e # 重新抛出HTTPException
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"生成RSS失败: {e}")
 
 
+@app.get('/cache_stats', summary="查看论文缓存的命中、淘汰等统计")
+def cache_stats():
+    return memory_cache.stats()
+
+
+@app.get('/enhance_queue', summary="查看后台AI增强队列的状态")
+def enhance_queue_stats():
+    return db_manager.enhancement_queue_stats()
+
+
 @app.get('/movie_feed', summary="获取每日电影RSS", response_description="RSS XML内容")
 def movie_feed():
     xml = generate_movie_rss()
@@ -0,0 +1,110 @@
+"""定时任务按日期保存的检查点。
+
+运行过程中只追加写入检查点文件，不改动对外提供的数据文件：
+
+    {date}.checkpoint.jsonl                         爬取到的论文（补全详情后会再追加一行）
+    {date}_AI_enhanced_{language}.checkpoint.jsonl  AI增强完成的论文
+    {date}.checkpoint.json                          运行状态：爬取是否完成、整个流程是否完成
+
+检查点 JSONL 只追加，同一 id 以最后一行为准；进程中途退出时最后一行可能不完整，读取时忽略。
+以 --resume 运行时从这些文件恢复，已经完成的爬取、详情查询和AI增强不会重做。
+
+整个流程成功后由 publish() 去重写出 {date}.jsonl 和 {date}_AI_enhanced_{language}.jsonl
+（JSONL 存储后端读取的文件），并以原子替换的方式发布，运行失败时原有的数据文件保持不变。
+"""
+import os
+import json
+import logging
+import threading
+
+DATA_DIR = os.environ.get('DATA_DIR', 'data')
+
+class Checkpoint:
+    def __init__(self, date: str, language: str = "Chinese", data_dir: str = None):
+        self.logger = logging.getLogger(__name__)
+        self.date = date
+        self.data_dir = data_dir or DATA_DIR
+        # 发布后的数据文件
+        self.crawl_path = os.path.join(self.data_dir, f"{date}.jsonl")
+        self.enhanced_path = os.path.join(self.data_dir, f"{date}_AI_enhanced_{language}.jsonl")
+        # 运行中写入的检查点文件
+        self.crawl_checkpoint = os.path.join(self.data_dir, f"{date}.checkpoint.jsonl")
+        self.enhanced_checkpoint = os.path.join(self.data_dir, f"{date}_AI_enhanced_{language}.checkpoint.jsonl")
+        self.state_path = os.path.join(self.data_dir, f"{date}.checkpoint.json")
+        # 流水线各阶段的线程会同时追加
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """开始新的一次完整运行，清空当天的检查点。"""
+        os.makedirs(self.data_dir, exist_ok=True)
+        for path in (self.crawl_checkpoint, self.enhanced_checkpoint):
+            open(path, "w", encoding="utf-8").close()
+        self.save_state(crawled=False, completed=False)
+
+    def state(self) -> dict:
+        state = {"crawled": False, "completed": False}
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"读取检查点状态 {self.state_path} 失败，视为未开始: {e}")
+        return state
+
+    def save_state(self, **changes):
+        state = dict(self.state(), date=self.date, **changes)
+        os.makedirs(self.data_dir, exist_ok=True)
+        # 先写临时文件再替换，中途退出不会留下损坏的状态文件
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def _append(self, path: str, items: list):
+        if not items:
+            return
+        lines = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+        with self._lock:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+    def record_crawled(self, items: list):
+        self._append(self.crawl_checkpoint, items)
+
+    def record_enhanced(self, items: list):
+        self._append(self.enhanced_checkpoint, items)
+
+    def _load(self, path: str) -> dict:
+        items = {}
+        if not os.path.exists(path):
+            return items
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    self.logger.warning(f"忽略检查点 {path} 中不完整的一行")
+                    continue
+                items[item["id"]] = item
+        return items
+
+    def load(self) -> tuple:
+        """返回 ({id: 已爬取的论文}, {id: 已增强的论文})，保持首次写入的顺序。"""
+        return self._load(self.crawl_checkpoint), self._load(self.enhanced_checkpoint)
+
+    def publish(self):
+        """流程成功后调用：把检查点去重后原子替换到数据文件并标记完成，再删除检查点 JSONL。
+
+        标记完成之前中途退出时，检查点仍在，--resume 会重新发布。
+        """
+        crawled, enhanced = self.load()
+        for items, path in ((crawled, self.crawl_path), (enhanced, self.enhanced_path)):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(item, ensure_ascii=False) + "\n" for item in items.values())
+            os.replace(tmp_path, path)
+        self.save_state(completed=True)
+        for path in (self.crawl_checkpoint, self.enhanced_checkpoint):
+            if os.path.exists(path):
+                os.remove(path)
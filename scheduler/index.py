@@ -2,28 +2,57 @@
 from scrapy.utils.reactor import install_reactor
 install_reactor("twisted.internet.asyncioreactor.AsyncioSelectorReactor")
 
+import re
 import json
+import argparse
 from datetime import datetime, timezone, timedelta
 import logging
 from scrapy.crawler import CrawlerRunner
 from twisted.internet import reactor,defer
-from concurrent.futures import ThreadPoolExecutor
 
 import arxiv
 
 from daily_arxiv.daily_arxiv.spiders.arxiv import ArxivSpider
 from daily_arxiv.daily_arxiv.pipelines import DailyArxivPipeline
 from ai.enhance import run_enhancement_process
-from api.database import DatabaseManager
+from api.database import DatabaseManager, close_pools
+from api.jobs import JobStore, ProgressReporter
+from ai.worker import needs_enhancement
+from utils.ledger import Ledger
+from scheduler.pipeline import Pipeline, Stage
+from scheduler.checkpoint import Checkpoint
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
 
+# 每次 arXiv API 查询包含的论文 id 数
+ARXIV_ID_CHUNK_SIZE = int(os.environ.get("ARXIV_ID_CHUNK_SIZE", "200"))
+# arXiv API 要求相邻请求间隔至少 3 秒
+ARXIV_API_DELAY = float(os.environ.get("ARXIV_API_DELAY", "3"))
+ARXIV_API_RETRIES = int(os.environ.get("ARXIV_API_RETRIES", "3"))
+ARXIV_VERSION_RE = re.compile(r'v\d+$')
+
+# 流水线各阶段的并发和批大小
+PIPELINE_ENHANCE_WORKERS = int(os.environ.get("PIPELINE_ENHANCE_WORKERS", "2"))
+PIPELINE_ENHANCE_BATCH = int(os.environ.get("PIPELINE_ENHANCE_BATCH", "50"))
+PIPELINE_WRITE_BATCH = int(os.environ.get("PIPELINE_WRITE_BATCH", "100"))
+
 class DailyArXivProcessor:
-    def __init__(self, language="Chinese"):
+    def __init__(self, language="Chinese", job_id=None):
         self.language = language
+        # 由 /do 启动时的任务 id，运行期间定期把进度写入任务记录
+        self.job_id = job_id
         self.logger = self._setup_logger()
         self.db_manager = DatabaseManager()
+        self.db_ready = False
+        # 本次运行的检查点，由 run() 创建
+        self.checkpoint = None
+        self.detail_ledger = Ledger('detail', self.db_manager)
+        self.enhance_ledger = Ledger('enhance', self.db_manager)
+        # 所有详情查询共用一个客户端，请求间隔和重试由它统一控制
+        self.arxiv_client = arxiv.Client(
+            page_size=ARXIV_ID_CHUNK_SIZE, delay_seconds=ARXIV_API_DELAY, num_retries=ARXIV_API_RETRIES
+        )
 
     def _setup_logger(self):
         logging.basicConfig(
@@ -34,11 +63,8 @@ class DailyArXivProcessor:
         logging.getLogger('arxiv').setLevel(logging.WARNING)
         return logging.getLogger(__name__)
 
-    def _fetch_paper_details(self, item):
-        search = arxiv.Search(
-            id_list=[item["id"]],
-        )
-        paper = next(arxiv.Client().results(search))
+    @staticmethod
+    def _apply_paper_details(item, paper):
         item["authors"] = [a.name for a in paper.authors]
         item["title"] = paper.title
         item["categories"] = paper.categories
@@ -46,35 +72,205 @@ class DailyArXivProcessor:
         item["summary"] = paper.summary
         return item
 
-    def run(self):
+    def _fetch_paper_details(self, ids):
+        """按 id_list 分批查询 arXiv API，返回 ({论文id: arxiv.Result}, {论文id: 错误信息})。
+
+        各批次依次通过共享的 arxiv.Client 发出，由它负责请求间隔和重试；
+        某一批失败或个别 id 未返回时只记录错误，不影响其他论文。
+        """
+        found, errors = {}, {}
+        for i in range(0, len(ids), ARXIV_ID_CHUNK_SIZE):
+            chunk = ids[i:i + ARXIV_ID_CHUNK_SIZE]
+            search = arxiv.Search(id_list=chunk, max_results=len(chunk))
+            try:
+                for paper in self.arxiv_client.results(search):
+                    short_id = paper.get_short_id()
+                    # 返回的 id 带版本号（如 2506.22439v1），按请求时的形式映射回去
+                    found[short_id] = paper
+                    found.setdefault(ARXIV_VERSION_RE.sub('', short_id), paper)
+            except Exception as e:
+                self.logger.warning(f"arXiv API 批量查询失败（{len(chunk)} 篇）: {e}")
+                for paper_id in chunk:
+                    errors[paper_id] = str(e) or type(e).__name__
+        for paper_id in ids:
+            if paper_id not in found and paper_id not in errors:
+                errors[paper_id] = "arXiv API 未返回该论文"
+        return {paper_id: found[paper_id] for paper_id in ids if paper_id in found}, errors
+
+    @staticmethod
+    def _has_details(item):
+        # 爬虫以 full 模式运行时列表页已提供完整信息
+        return bool(item.get("title") and item.get("summary"))
+
+    def _fetch_details(self, raw_data):
+        """补全缺少详细信息的论文；跳过台账中已放弃或未到重试时间的论文，失败的论文不进入后续阶段。"""
+        missing = [item for item in raw_data if not self._has_details(item)]
+        if not missing:
+            return raw_data
+        due = set(self.detail_ledger.due([item["id"] for item in missing]))
+        todo = [item for item in missing if item["id"] in due]
+        found, errors = self._fetch_paper_details(list(dict.fromkeys(item["id"] for item in todo)))
+        for item in todo:
+            if item["id"] in found:
+                self._apply_paper_details(item, found[item["id"]])
+        detailed = [item for item in raw_data if self._has_details(item)]
+        self.detail_ledger.mark_ok(list(found))
+        if errors:
+            self.logger.warning(f"{len(errors)} 篇论文详细信息获取失败，将在之后的运行中重试: {list(errors)[:10]}")
+            self.detail_ledger.mark_failed(errors)
+        return detailed
+
+    def _drop_stored(self, raw_data):
+        """去掉重复的论文（出现在多个分类页），再用一次批量查询丢弃已完整入库的论文。"""
+        first_seen = {}
+        for item in raw_data:
+            first_seen.setdefault(item["id"], item)
+        unique = list(first_seen.values())
+        stored = self.db_manager.get_complete_paper_ids([item["id"] for item in unique])
+        if stored:
+            self.logger.info(f"{len(unique)} 篇论文中有 {len(stored)} 篇已完整入库，跳过")
+        return [item for item in unique if item["id"] not in stored]
+
+    def _enhance(self, data):
+        """AI增强；台账中已放弃或未到重试时间的论文不调用模型，以无AI字段的形式入库。"""
+        due = set(self.enhance_ledger.due([item["id"] for item in data]))
+        todo = [item for item in data if item["id"] in due]
+        errors = {}
+        try:
+            run_enhancement_process(todo, errors=errors)
+        except Exception as e:
+            # 整批计为失败，这些论文先以无AI字段的形式入库，按台账决定之后是否重试
+            self.logger.error(f"AI增强本批出错: {e}")
+            errors.update((item["id"], str(e) or type(e).__name__) for item in todo if needs_enhancement(item))
+        for item in todo:
+            if needs_enhancement(item) and item["id"] not in errors:
+                errors[item["id"]] = "AI增强结果为空"
+        self.enhance_ledger.mark_ok([item["id"] for item in todo if item["id"] not in errors])
+        if errors:
+            self.enhance_ledger.mark_failed(errors)
+        if self.checkpoint is not None:
+            # 没有得到AI字段的论文不记录，恢复时按台账决定是否重试
+            self.checkpoint.record_enhanced([item for item in data if not needs_enhancement(item)])
+        return data
+
+    def _detail_batch(self, batch):
+        # 去重和详情补全按批进行：每批一次数据库查询、至多几次 arXiv API 请求
+        new_data = self._drop_stored(batch) if self.db_ready else batch
+        missing = {item["id"] for item in new_data if not self._has_details(item)}
+        detailed = self._fetch_details(new_data)
+        if self.checkpoint is not None and missing:
+            self.checkpoint.record_crawled([item for item in detailed if item["id"] in missing])
+        return detailed
+
+    def _write_batch(self, batch):
+        if self.db_ready:
+            self.db_manager.insert_data(batch)
+        return batch
+
+    def build_pipeline(self) -> Pipeline:
+        """爬虫 -> 去重/详情 -> AI增强 -> 写库，各阶段之间用有界队列相连。"""
+        return Pipeline([
+            Stage("detail", self._detail_batch, workers=1, batch_size=ARXIV_ID_CHUNK_SIZE),
+            Stage("enhance", self._enhance, workers=PIPELINE_ENHANCE_WORKERS, batch_size=PIPELINE_ENHANCE_BATCH),
+            Stage("write", self._write_batch, workers=1, batch_size=PIPELINE_WRITE_BATCH),
+        ])
+
+    def run(self, resume=False):
+        """执行当天的完整流程；resume 为 True 时从当天的检查点继续，跳过已完成的部分。"""
         # 定义北京时区 (UTC+8)
         beijing_tz = timezone(timedelta(hours=8))
         # 获取当前北京时间并格式化日期
         today = datetime.now(beijing_tz).strftime("%Y-%m-%d")
-        self.logger.info(f"--- 开始 {today} arXiv 处理流程 ---")
+        self.logger.info(f"--- 开始 {today} arXiv 处理流程{'（从检查点恢复）' if resume else ''} ---")
         try:
-            # 1. 运行Scrapy爬虫（内存捕获）
-            raw_data = self._run_scrapy_in_memory()
-            
-            # 2. 并行获取论文详细信息
-            self.logger.info(f"--- 开始并行获取论文详细信息 ---")
-            with ThreadPoolExecutor(max_workers=20) as executor:
-                detailed_data = list(executor.map(self._fetch_paper_details, raw_data))
-            self.logger.info(f"--- 论文详细信息获取完毕，共 {len(detailed_data)} 条 ---")
-
-            # 3. AI增强处理（内存数据）
-            enhanced_data = run_enhancement_process(detailed_data)
-            
-            # 4. 存储到数据库
-            if self.db_manager.connect_and_create_table():
-                self.db_manager.insert_data(enhanced_data)
-            self.logger.info(f"--- 执行完毕，共抓取 {len(raw_data)} 条，增强 {len(enhanced_data)} 条 ---")
+            self.checkpoint = checkpoint = Checkpoint(today, self.language)
+            crawled, enhanced = {}, {}
+            if resume:
+                state = checkpoint.state()
+                if state["completed"]:
+                    self.logger.info(f"{today} 的处理流程已完成，无需恢复")
+                    if self.job_id:
+                        JobStore(self.db_manager).save(self.job_id, progress={
+                            "phase": "done", "date": today, "resume": resume, "already_completed": True})
+                    return True
+                crawled, enhanced = checkpoint.load()
+                self.logger.info(f"检查点中已爬取 {len(crawled)} 篇，已增强 {len(enhanced)} 篇，"
+                                 f"爬取{'已' if state['crawled'] else '未'}完成")
+            else:
+                state = {"crawled": False}
+                checkpoint.reset()
+
+            # 先执行数据库迁移，AI增强缓存等表需要在后续阶段之前就绪
+            self.db_ready = self.db_manager.connect_and_create_table()
+
+            # 爬虫每解析出一篇论文就送入流水线，详情获取、AI增强和写库与爬取同时进行
+            pipeline = self.build_pipeline().start()
+            seen = set()
+            crawl_done = False
+            progress = {"phase": "crawl", "date": today, "resume": resume}
+            reporter = None
+            if self.job_id:
+                reporter = ProgressReporter(JobStore(self.db_manager), self.job_id,
+                                            lambda: dict(progress, crawled=len(seen), **pipeline.progress())).start()
+
+            def on_item(item):
+                # 同一篇论文可能出现在多个分类页中
+                if item["id"] not in seen:
+                    seen.add(item["id"])
+                    checkpoint.record_crawled([item])
+                    pipeline.put(item)
+
+            try:
+                # 已增强的论文直接写库，其余已爬取的论文从详情阶段继续（已有详情的不会再查询）
+                for paper_id, item in enhanced.items():
+                    seen.add(paper_id)
+                    pipeline.put(item, stage="write")
+                for paper_id, item in crawled.items():
+                    if paper_id not in seen:
+                        seen.add(paper_id)
+                        pipeline.put(item)
+                if state["crawled"]:
+                    raw_data = list(crawled.values())
+                else:
+                    raw_data, crawl_stats = self._run_scrapy_in_memory(on_item)
+                    crawl_errors = self._crawl_errors(crawl_stats)
+                    if crawl_errors:
+                        self.logger.warning(f"爬取过程中出现 {crawl_errors} 次下载异常或错误")
+                    # 没有得到任何论文时（多半是网络故障）不标记爬取完成，下次运行会重新爬取
+                    if raw_data:
+                        checkpoint.save_state(crawled=True)
+                crawl_done = bool(raw_data)
+                # 爬取结束，等待流水线处理完剩余条目
+                progress["phase"] = "finishing"
+            finally:
+                pipeline.close()
+                if reporter is not None:
+                    ok = progress["phase"] == "finishing" and crawl_done and not pipeline.errors
+                    progress["phase"] = "done" if ok else "failed"
+                    reporter.stop()
+            written = pipeline.stages[-1].emitted
+            self.logger.info(pipeline.summary())
+            self.logger.info(f"--- 执行完毕，共抓取 {len(raw_data)} 条（去重后 {len(seen)} 条），写入 {written} 条 ---")
+            self.logger.info(f"失败台账：{self.detail_ledger.summary()}；{self.enhance_ledger.summary()}")
+            if not crawl_done:
+                self.logger.error("爬取失败或没有得到任何论文，未标记完成，之后的运行会重新爬取")
+                return False
+            if pipeline.errors:
+                self.logger.error("部分批次处理失败，可使用 --resume 从检查点继续")
+                return False
+            checkpoint.publish()
             return True
         except Exception as e:
-            print(e)
+            self.logger.error(f"处理流程出错: {e}，可使用 --resume 从检查点继续")
             return False
 
-    def _run_scrapy_in_memory(self):
+    @staticmethod
+    def _crawl_errors(stats: dict) -> int:
+        # Scrapy 会吞掉 DNS、连接和 HTTP 错误，只能从统计信息判断爬取是否出错
+        return stats.get("downloader/exception_count", 0) + stats.get("log_count/ERROR", 0)
+
+    def _run_scrapy_in_memory(self, on_item=None):
+        """运行爬虫，返回 (论文列表, Scrapy 统计信息)。"""
         results = []
         pipeline_instance = DailyArxivPipeline() # 实例化管道
         class CollectItemsSpider(ArxivSpider):
@@ -85,21 +281,35 @@ class DailyArXivProcessor:
                 for item in super().parse(response):
                     processed_item = pipeline_instance.process_item(item, self) # 调用管道处理item
                     results.append(dict(processed_item))
+                    if on_item is not None:
+                        on_item(dict(processed_item))
                     yield processed_item
         runner = CrawlerRunner()
+        crawler = runner.create_crawler(CollectItemsSpider)
         @defer.inlineCallbacks
         def crawl():
-            yield runner.crawl(CollectItemsSpider)
-            reactor.stop()
+            try:
+                yield runner.crawl(crawler)
+            finally:
+                reactor.stop()
         crawl()
         reactor.run()
         self.logger.info(f"Scrapy爬虫完成，捕获 {len(results)} 条数据")
-        return results
+        return results, crawler.stats.get_stats()
 
 
 if __name__ == "__main__":
-    processor = DailyArXivProcessor(language="Chinese")
-    if processor.run():
-        print("处理成功！")
-    else:
-        print("处理失败")
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume", action="store_true", help="从当天的检查点继续上次未完成的运行")
+    parser.add_argument("--job-id", help="由 /do 启动时的任务 id，用于记录进度")
+    args = parser.parse_args()
+    processor = DailyArXivProcessor(language="Chinese", job_id=args.job_id)
+    try:
+        ok = processor.run(resume=args.resume)
+        if ok:
+            print("处理成功！")
+        else:
+            print("处理失败")
+    finally:
+        close_pools()
+    sys.exit(0 if ok else 1)
\ No newline at end of file
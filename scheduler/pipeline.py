@@ -0,0 +1,160 @@
+"""定时任务使用的流式流水线。
+
+各阶段之间用有界队列相连，每个阶段有自己的工作线程数和批大小：条目一进入
+队列就可以被下游处理，下游处理不过来时上游的 put 会阻塞（背压），
+整体耗时接近最慢的阶段，而不是所有阶段耗时之和。
+"""
+import os
+import queue
+import time
+import logging
+import threading
+from typing import Callable, Optional
+
+# 阶段之间队列的容量（条目数）
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "1000"))
+# 凑批时最多等待的时间（秒），到时即使批未满也开始处理
+PIPELINE_MAX_WAIT = float(os.environ.get("PIPELINE_MAX_WAIT", "2"))
+
+# 队列结束标记
+STOP = object()
+
+class Stage:
+    """流水线中的一个阶段：从 inbox 取条目凑成一批交给 func，func 返回的条目放入下游队列。
+
+    func 自行处理单个条目的失败（例如记录到失败台账）；整批抛出异常时记录错误并丢弃该批。
+    """
+    def __init__(self, name: str, func: Callable[[list], list], workers: int = 1, batch_size: int = 1,
+                 max_wait: float = PIPELINE_MAX_WAIT, queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.downstream: Optional["Stage"] = None
+        self._threads = []
+        self._lock = threading.Lock()
+        self._alive = 0
+        # 统计
+        self.received = 0
+        self.emitted = 0
+        self.batches = 0
+        self.errors = 0
+        self.busy = 0.0
+
+    def start(self):
+        self._alive = self.workers
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"pipeline-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _collect(self):
+        """取一批条目，返回 (批, 是否已收到结束标记)。"""
+        item = self.inbox.get()
+        if item is STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.inbox.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _loop(self):
+        while True:
+            batch, stopping = self._collect()
+            if batch:
+                self._process(batch)
+            if stopping:
+                break
+        # 把结束标记留给同阶段的其他线程；最后一个线程退出时通知下游
+        self.inbox.put(STOP)
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if last and self.downstream is not None:
+            self.downstream.inbox.put(STOP)
+
+    def _process(self, batch: list):
+        start = time.monotonic()
+        try:
+            results = self.func(batch) or []
+        except Exception as e:
+            self.logger.error(f"流水线阶段 {self.name} 处理 {len(batch)} 条时出错: {e}")
+            results = []
+            with self._lock:
+                self.errors += 1
+        end = time.monotonic()
+        with self._lock:
+            self.received += len(batch)
+            self.emitted += len(results)
+            self.batches += 1
+            self.busy += end - start
+        if self.downstream is not None:
+            for item in results:
+                self.downstream.inbox.put(item)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"received": self.received, "emitted": self.emitted, "batches": self.batches,
+                    "errors": self.errors, "busy": round(self.busy, 1),
+                    # 线程全部退出后队列中只剩结束标记
+                    "queued": self.inbox.qsize() if self._alive else 0}
+
+    def summary(self) -> str:
+        return (f"{self.name}: 输入 {self.received} 条，输出 {self.emitted} 条，{self.batches} 批，"
+                f"忙碌 {self.busy:.1f}s（{self.workers} 线程），出错 {self.errors} 批")
+
+class Pipeline:
+    """把若干 Stage 首尾相连。put() 在第一个阶段队列已满时阻塞，close() 后等待所有阶段处理完。"""
+    def __init__(self, stages: list):
+        self.logger = logging.getLogger(__name__)
+        self.stages = stages
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.downstream = downstream
+        self.started_at = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        for stage in self.stages:
+            stage.start()
+        return self
+
+    def put(self, item, stage: Optional[str] = None):
+        """送入第一个阶段；指定 stage 时跳过它之前的阶段（例如从检查点恢复已完成部分处理的条目）。"""
+        target = self.stages[0] if stage is None else next(st for st in self.stages if st.name == stage)
+        target.inbox.put(item)
+
+    def close(self):
+        """不再有新条目，等待各阶段依次处理完剩余条目。"""
+        self.stages[0].inbox.put(STOP)
+        for stage in self.stages:
+            stage.join()
+
+    @property
+    def errors(self) -> int:
+        return sum(stage.errors for stage in self.stages)
+
+    def progress(self) -> dict:
+        """各阶段当前的计数、忙碌时间和排队条目数。"""
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {"elapsed": round(elapsed, 1), "stages": {stage.name: stage.stats() for stage in self.stages}}
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return f"流水线总耗时 {elapsed:.1f}s；" + "；".join(stage.summary() for stage in self.stages)
@@ -0,0 +1,88 @@
+import pytest
+
+import utils.cache
+from utils.cache import Cache, estimate_size
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(utils.cache.time, 'monotonic', clock)
+    return clock
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = Cache()
+    cache.set('a', 1, ttl=10)
+    cache.set('b', 2)
+    clock.now += 9.9
+    assert cache.get('a') == 1
+    clock.now += 0.1
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+    assert cache.stats()['expirations'] == 1
+    assert len(cache) == 1
+
+
+def test_default_ttl_and_override(clock):
+    cache = Cache(default_ttl=5)
+    cache.set('short', 1)
+    cache.set('long', 2, ttl=60)
+    clock.now += 30
+    assert cache.get('short') is None
+    assert cache.get('long') == 2
+
+
+def test_set_replaces_expiry(clock):
+    cache = Cache()
+    cache.set('a', 1, ttl=10)
+    clock.now += 8
+    cache.set('a', 2, ttl=10)
+    clock.now += 8
+    assert cache.get('a') == 2
+
+
+def test_evicts_least_recently_used_entry():
+    cache = Cache(max_entries=3)
+    for key in 'abc':
+        cache.set(key, key)
+    # 读取 a 后，最久未使用的是 b
+    assert cache.get('a') == 'a'
+    cache.set('d', 'd')
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == ['a', 'c', 'd']
+    assert cache.stats()['evictions'] == 1
+
+
+def test_evicts_by_estimated_bytes():
+    value = 'x' * 1000
+    size = estimate_size(value)
+    cache = Cache(max_bytes=size * 2)
+    cache.set('a', value)
+    cache.set('b', 'y' * 1000)
+    cache.set('c', 'z' * 1000)
+    assert cache.get('a') is None
+    assert cache.stats()['bytes'] <= size * 2
+    # 单个条目超过总字节上限时不缓存，也不淘汰已有条目
+    cache.set('huge', 'h' * 10000)
+    assert cache.get('huge') is None
+    assert cache.get('b') is not None and cache.get('c') is not None
+
+
+def test_delete_and_clear_release_bytes():
+    cache = Cache()
+    cache.set('a', [1, 2, 3])
+    cache.set('b', {'k': 'v'})
+    cache.delete('a')
+    assert cache.get('a') is None
+    assert cache.stats()['bytes'] == estimate_size({'k': 'v'})
+    cache.clear()
+    assert len(cache) == 0 and cache.stats()['bytes'] == 0
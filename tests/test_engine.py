@@ -0,0 +1,187 @@
+import asyncio
+import json
+import random
+
+import httpx
+import openai
+import pytest
+
+import ai.engine
+import ai.fake_openai as fake_openai
+from ai.engine import AdaptiveLimiter, EnhancementEngine
+
+TEMPLATE = [
+    {'role': 'system', 'content': 'Summarize the paper as JSON.'},
+    {'role': 'user', 'content': 'Language: {language}\n{content}'},
+]
+BATCH_TEMPLATE = [
+    {'role': 'system', 'content': 'Summarize each paper as JSON.'},
+    {'role': 'user', 'content': 'Language: {language}\n{content}'},
+]
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    monkeypatch.setattr(fake_openai, 'FAKE_OPENAI_LATENCY', 0.01)
+    monkeypatch.setattr(fake_openai, 'FAKE_OPENAI_MAX_CONCURRENCY', 100)
+    monkeypatch.setattr(fake_openai, 'FAKE_OPENAI_ERROR_RATE', 0.0)
+    monkeypatch.setattr(fake_openai, 'FAKE_OPENAI_BATCH_DROP_RATE', 0.0)
+    monkeypatch.setattr(fake_openai, 'state', {'in_flight': 0, 'requests': 0, 'rate_limited': 0, 'errors': 0})
+    # 缩短退避时间；429 仍按服务端的 Retry-After 等待
+    monkeypatch.setattr(ai.engine, 'ENHANCE_BACKOFF_BASE', 0.01)
+    monkeypatch.setattr(ai.engine, 'ENHANCE_BACKOFF_MAX', 0.05)
+    random.seed(0)
+    return fake_openai
+
+
+def papers(n):
+    return [{'id': f'2507.{i:05d}', 'summary': f'Abstract number {i}.'} for i in range(n)]
+
+
+def run(data, batch=False, **kwargs):
+    async def main():
+        transport = httpx.ASGITransport(app=fake_openai.app)
+        async with httpx.AsyncClient(transport=transport) as http_client:
+            client = openai.AsyncOpenAI(api_key='fake', base_url='http://fake/v1', max_retries=0,
+                                        http_client=http_client)
+            engine = EnhancementEngine(client, 'fake', TEMPLATE, 'English',
+                                       batch_template=BATCH_TEMPLATE if batch else None, **kwargs)
+            await engine.run(data)
+            return engine
+    return asyncio.run(main())
+
+
+def expected_ai(d):
+    content = TEMPLATE[1]['content'].format(language='English', content=d['summary'])
+    return fake_openai.fake_structure(content)
+
+
+def test_limiter_grows_additively_and_shrinks_multiplicatively(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(ai.engine.time, 'monotonic', lambda: clock[0])
+    limiter = AdaptiveLimiter(initial=4, minimum=2, maximum=5, target_latency=1.0)
+
+    async def main():
+        for _ in range(4):
+            await limiter.on_success(0.1)
+        assert limiter.limit == pytest.approx(5.0, abs=0.1)
+        for _ in range(10):
+            await limiter.on_success(0.1)
+        assert limiter.limit == 5
+        await limiter.on_overload()
+        assert limiter.limit == 2.5
+        # 一秒内的多次 429 只收缩一次
+        await limiter.on_overload()
+        assert limiter.limit == 2.5
+        clock[0] += 2
+        await limiter.on_overload()
+        assert limiter.limit == 2
+        clock[0] += 2
+        await limiter.on_success(5.0)
+        assert limiter.limit == 2
+    asyncio.run(main())
+
+
+def test_limiter_caps_in_flight_requests():
+    limiter = AdaptiveLimiter(initial=2, minimum=1, maximum=2)
+    peak = [0]
+
+    async def task():
+        await limiter.acquire()
+        peak[0] = max(peak[0], limiter.in_flight)
+        await asyncio.sleep(0.01)
+        await limiter.release()
+
+    async def main():
+        await asyncio.gather(*(task() for _ in range(10)))
+    asyncio.run(main())
+    assert peak[0] == 2
+
+
+def test_enhances_every_item(fake):
+    data = papers(20)
+    engine = run(data)
+    assert engine.stats.succeeded == 20 and not engine.stats.failed
+    assert all(d['AI'] == expected_ai(d) for d in data)
+
+
+def test_rate_limited_requests_are_retried_and_shrink_concurrency(fake):
+    fake.FAKE_OPENAI_MAX_CONCURRENCY = 2
+    data = papers(30)
+    limiter = AdaptiveLimiter(initial=10, minimum=1, maximum=10)
+    # 并发上限很低时个别论文可能连续多次遇到 429，放宽重试次数以免偶发失败
+    engine = run(data, limiter=limiter, max_attempts=20)
+    assert fake.state['rate_limited'] > 0
+    assert engine.stats.rate_limited == fake.state['rate_limited']
+    assert limiter.limit < 10
+    assert engine.stats.succeeded == 30 and not engine.stats.failed
+
+
+def test_server_errors_are_retried(fake):
+    fake.FAKE_OPENAI_ERROR_RATE = 0.3
+    data = papers(20)
+    engine = run(data, max_attempts=10)
+    assert fake.state['errors'] > 0
+    assert engine.stats.retries >= fake.state['errors']
+    assert engine.stats.succeeded == 20 and not engine.stats.failed
+
+
+def test_persistent_server_errors_mark_items_failed(fake):
+    fake.FAKE_OPENAI_ERROR_RATE = 1.0
+    data = papers(3)
+    engine = run(data, max_attempts=2)
+    assert set(engine.stats.failed) == {d['id'] for d in data}
+    assert engine.stats.succeeded == 0
+    assert all('AI' not in d for d in data)
+
+
+def test_batch_requests_cover_every_item(fake):
+    data = papers(25)
+    engine = run(data, batch=True)
+    assert engine.stats.succeeded == 25 and engine.stats.batch_fallbacks == 0
+    assert fake.state['requests'] < 25
+    assert all(set(d['AI']) == {'tldr', 'motivation', 'method', 'result', 'conclusion'} for d in data)
+
+
+def test_papers_missing_from_batch_fall_back_to_single_requests(fake):
+    fake.FAKE_OPENAI_BATCH_DROP_RATE = 0.3
+    data = papers(20)
+    engine = run(data, batch=True)
+    assert engine.stats.batch_fallbacks > 0
+    assert engine.stats.succeeded == 20 and not engine.stats.failed
+    fallback = [d for d in data if d['AI'] == expected_ai(d)]
+    assert len(fallback) == engine.stats.batch_fallbacks
+
+
+def test_invalid_batch_output_falls_back_for_whole_batch(fake, monkeypatch):
+    fake_content = fake_openai.fake_content
+
+    def broken_batches(messages):
+        if '[id: ' in messages[-1]['content']:
+            return json.dumps({'papers': 'oops'})
+        return fake_content(messages)
+    monkeypatch.setattr(fake_openai, 'fake_content', broken_batches)
+    data = papers(5)
+    engine = run(data, batch=True)
+    assert engine.stats.batch_fallbacks == 5
+    assert all(d['AI'] == expected_ai(d) for d in data)
+
+
+def test_failed_batch_request_falls_back_to_single_requests(fake, monkeypatch):
+    class Dice:
+        # 批量请求的两次尝试都返回 500，之后的单篇请求全部成功
+        rolls = iter([0.0, 0.0] + [1.0] * 10)
+
+        def random(self):
+            return next(self.rolls)
+
+        def expovariate(self, rate):
+            return 0.0
+    monkeypatch.setattr(fake_openai, 'random', Dice())
+    fake.FAKE_OPENAI_ERROR_RATE = 0.5
+    data = papers(5)
+    engine = run(data, batch=True, max_attempts=2)
+    assert fake.state['errors'] == 2
+    assert engine.stats.batch_fallbacks == 5
+    assert engine.stats.succeeded == 5 and not engine.stats.failed
+    assert all(d['AI'] == expected_ai(d) for d in data)
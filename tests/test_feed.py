@@ -0,0 +1,136 @@
+import json
+from email.utils import format_datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import rss_server
+from api.storage import JsonlStore
+
+DATES = ['2025-07-02', '2025-07-01']
+IDENTITY = {'Accept-Encoding': 'identity'}
+
+
+def write_day(data_dir, date, ids):
+    with open(data_dir / f'{date}_AI_enhanced_Chinese.jsonl', 'a', encoding='utf-8') as f:
+        for paper_id in ids:
+            f.write(json.dumps({
+                'id': paper_id, 'categories': ['cs.CV'], 'title': f'Title {paper_id}',
+                'summary': 'A summary', 'authors': ['A. Author'],
+                'AI': {'tldr': 't', 'motivation': 'm', 'method': 'm', 'result': 'r', 'conclusion': 'c'},
+            }) + '\n')
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    write_day(tmp_path, DATES[1], ['2507.00001', '2507.00002'])
+    monkeypatch.setattr(rss_server, 'store', JsonlStore(str(tmp_path), 'Chinese'))
+    monkeypatch.setattr(rss_server, 'get_recent_dates', lambda n=30: DATES[:n])
+    monkeypatch.setattr(rss_server.db_manager, 'conn_string', None)
+    rss_server.memory_cache.clear()
+    rss_server.feed_cache.clear()
+    yield TestClient(rss_server.app)
+    rss_server.memory_cache.clear()
+    rss_server.feed_cache.clear()
+
+
+def get(client, headers=None, **params):
+    return client.get('/feed', params={'day': 2, **params}, headers={**IDENTITY, **(headers or {})})
+
+
+def test_feed_sends_validators(client):
+    first = get(client)
+    assert first.status_code == 200
+    assert first.headers['etag'].startswith('"')
+    assert first.headers['last-modified']
+    second = get(client)
+    assert second.headers['etag'] == first.headers['etag']
+    assert second.content == first.content
+
+
+@pytest.mark.parametrize('if_none_match', ['{etag}', 'W/{etag}', '"other", {etag}', '*'])
+def test_matching_if_none_match_returns_304(client, if_none_match):
+    etag = get(client).headers['etag']
+    res = get(client, {'If-None-Match': if_none_match.format(etag=etag)})
+    assert res.status_code == 304
+    assert res.content == b''
+    assert res.headers['etag'] == etag
+
+
+def test_stale_if_none_match_returns_200(client):
+    res = get(client, {'If-None-Match': '"stale"'})
+    assert res.status_code == 200
+
+
+def test_if_modified_since(client):
+    last_modified = get(client).headers['last-modified']
+    assert get(client, {'If-Modified-Since': last_modified}).status_code == 304
+    assert get(client, {'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'}).status_code == 200
+    assert get(client, {'If-Modified-Since': 'not a date'}).status_code == 200
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since(client):
+    last_modified = get(client).headers['last-modified']
+    res = get(client, {'If-None-Match': '"stale"', 'If-Modified-Since': last_modified})
+    assert res.status_code == 200
+
+
+def test_new_data_changes_etag(client, tmp_path):
+    etag = get(client).headers['etag']
+    write_day(tmp_path, DATES[0], ['2507.00003'])
+    rss_server.memory_cache.clear()
+    res = get(client, {'If-None-Match': etag})
+    assert res.status_code == 200
+    assert res.headers['etag'] != etag
+    assert b'2507.00003' in res.content
+
+
+@pytest.mark.parametrize('accept, available, expected', [
+    (None, {'gzip', 'br'}, None),
+    ('', {'gzip', 'br'}, None),
+    ('gzip', {'gzip', 'br'}, 'gzip'),
+    ('gzip, br', {'gzip', 'br'}, 'br'),
+    ('gzip, br', {'gzip'}, 'gzip'),
+    ('br;q=0.5, gzip', {'gzip', 'br'}, 'gzip'),
+    ('GZIP', {'gzip'}, 'gzip'),
+    ('gzip;q=0', {'gzip', 'br'}, None),
+    ('gzip;q=oops', {'gzip'}, None),
+    ('*', {'gzip'}, 'gzip'),
+    ('*;q=0, gzip', {'gzip', 'br'}, 'gzip'),
+    ('identity', {'gzip', 'br'}, None),
+    ('deflate', {'gzip'}, None),
+])
+def test_choose_encoding(accept, available, expected):
+    assert rss_server.choose_encoding(accept, available) == expected
+
+
+def test_compressed_response_has_its_own_etag(client):
+    plain = get(client)
+    res = get(client, {'Accept-Encoding': 'gzip'})
+    assert res.headers['content-encoding'] == 'gzip'
+    assert res.headers['vary'] == 'Accept-Encoding'
+    assert res.content == plain.content
+    assert res.headers['etag'] != plain.headers['etag']
+    # 客户端缓存的任一编码版本仍然有效时都返回 304
+    for etag in (plain.headers['etag'], res.headers['etag']):
+        assert get(client, {'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 304
+
+
+def test_streamed_feed_supports_conditional_get(client):
+    res = get(client, stream=1)
+    assert res.status_code == 200
+    assert b'2507.00002' in res.content
+    assert get(client, {'If-None-Match': res.headers['etag']}, stream=1).status_code == 304
+    last_modified = format_datetime(rss_server.StreamedFeed(None, 2, None).last_modified, usegmt=True)
+    assert res.headers['last-modified'] == last_modified
+
+
+def test_streamed_feed_returns_503_when_store_fails(client, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError('storage unavailable')
+        yield
+
+    monkeypatch.setattr(rss_server.store, 'iter_papers_between', fail)
+    assert get(client, stream=1).status_code == 503
+    monkeypatch.setattr(rss_server.store, 'papers_version', fail)
+    assert get(client, stream=1).status_code == 503
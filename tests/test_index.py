@@ -0,0 +1,102 @@
+import json
+import os
+
+import pytest
+
+from utils.index import (KeywordIndex, is_valid_keyword, keyword_like_patterns, matches_keywords,
+                         paper_text)
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', '2025-07-01.jsonl')
+
+KEYWORDS = ['c++', 'former', 'transformer', '3.5', 'gpt-4', 'graph neural', 'large language model',
+            'self-attention', 'diffusion', 'neural net', 'ai']
+
+
+def make_item(doc_id, title, summary=''):
+    return {'id': doc_id, 'title': title, 'summary': summary}
+
+
+@pytest.fixture(scope='module')
+def sample():
+    with open(DATA_FILE, encoding='utf-8') as f:
+        items = {}
+        for line in f:
+            item = json.loads(line)
+            items[item['id']] = item
+    index = KeywordIndex()
+    for doc_id, item in items.items():
+        index.add(doc_id, paper_text(item))
+    return items, index
+
+
+def build_index(items):
+    index = KeywordIndex()
+    for item in items:
+        index.add(item['id'], paper_text(item))
+    return index
+
+
+def like_prefilter(item, keywords):
+    # 按 SQL LIKE 的语义模拟数据库端预过滤
+    text = paper_text(item).lower()
+    for patterns in keyword_like_patterns(keywords) or []:
+        parts = [p[1:-1].replace('\\_', '_').replace('\\%', '%').replace('\\\\', '\\') for p in patterns]
+        if all(part in text for part in parts):
+            return True
+    return False
+
+
+@pytest.mark.parametrize('keyword', ['c', '+', '++', '.', ' -- ', ''])
+def test_rejects_single_character_and_punctuation_keywords(keyword):
+    assert not is_valid_keyword(keyword)
+    assert keyword_like_patterns([keyword]) is None
+    assert build_index([make_item('1', 'c c++ and c')]).search([keyword]) == set()
+
+
+def test_literal_keyword_does_not_match_single_letter_tokens():
+    items = [make_item('1', 'A C compiler'), make_item('2', 'Template tricks in C++17')]
+    assert build_index(items).search(['c++']) == {'2'}
+    assert [matches_keywords(item, ['c++']) for item in items] == [False, True]
+
+
+def test_literal_keyword_with_digits_matches_original_text():
+    items = [make_item('1', 'We fine-tune GPT-3.5 on math'), make_item('2', 'Results 3 5 times faster')]
+    assert build_index(items).search(['3.5']) == {'1'}
+    assert [matches_keywords(item, ['3.5']) for item in items] == [True, False]
+    assert like_prefilter(items[0], ['3.5']) and not like_prefilter(items[1], ['3.5'])
+
+
+def test_keyword_matches_inside_words():
+    items = [make_item('1', 'Vision Transformers at scale'), make_item('2', 'Performer kernels')]
+    assert build_index(items).search(['former']) == {'1', '2'}
+    assert build_index(items).search(['transform']) == {'1'}
+
+
+def test_phrase_may_start_and_end_inside_words():
+    items = [make_item('1', 'Subgraph neural networks'), make_item('2', 'Graph-based neural rendering')]
+    index = build_index(items)
+    assert index.search(['graph neural']) == {'1'}
+    assert index.search(['graph neural net']) == {'1'}
+    assert index.search(['graph based']) == {'2'}
+
+
+def test_index_agrees_with_scan_on_sample_data(sample):
+    items, index = sample
+    for keyword in KEYWORDS:
+        expected = {doc_id for doc_id, item in items.items() if matches_keywords(item, [keyword])}
+        assert index.search([keyword]) == expected, keyword
+
+
+def test_like_prefilter_never_drops_matching_items(sample):
+    items, _ = sample
+    for keyword in KEYWORDS:
+        for item in items.values():
+            if matches_keywords(item, [keyword]):
+                assert like_prefilter(item, [keyword]), (keyword, item['id'])
+
+
+def test_substring_keyword_keeps_previous_match_count(sample):
+    items, index = sample
+    # 与改为倒排索引之前按摘要子串匹配的结果相同（标题命中的论文额外计入）
+    summary_hits = {doc_id for doc_id, item in items.items() if 'former' in (item.get('summary') or '').lower()}
+    assert summary_hits <= index.search(['former'])
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+from benchmarks.bench_listing_parser import (FIXTURES_DIR, build_response, legacy_parse, normalize,
+                                             scale_listing)
+from daily_arxiv.daily_arxiv.spiders.arxiv import ArxivSpider
+
+FIXTURE = os.path.join(FIXTURES_DIR, 'arxiv_list_new_sample.html')
+
+
+@pytest.fixture(scope='module')
+def html():
+    with open(FIXTURE, encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('copies', [1, 3])
+@pytest.mark.parametrize('mode', ['ids', 'full'])
+def test_parser_matches_legacy_parser(html, mode, copies):
+    body = scale_listing(html, copies).encode('utf-8')
+    spider = ArxivSpider(mode=mode)
+    legacy = list(legacy_parse(spider, build_response(body)))
+    current = list(spider.parse(build_response(body)))
+    assert current
+    assert normalize(current) == normalize(legacy)
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+import scheduler.checkpoint
+from scheduler.index import DailyArXivProcessor
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    monkeypatch.setenv('DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(scheduler.checkpoint, 'DATA_DIR', str(tmp_path))
+    processor = DailyArXivProcessor()
+    # 不调用模型，条目原样进入写库阶段
+    processor._enhance = lambda data: data
+    processor.crawls = 0
+    return processor
+
+
+def stub_crawl(processor, items, stats):
+    def crawl(on_item=None):
+        processor.crawls += 1
+        for item in items:
+            on_item(dict(item))
+        return [dict(item) for item in items], dict(stats)
+    processor._run_scrapy_in_memory = crawl
+
+
+def published(tmp_path, date):
+    path = tmp_path / f"{date}.jsonl"
+    return path.read_text(encoding='utf-8') if path.exists() else None
+
+
+@pytest.mark.parametrize('stats', [
+    {'downloader/exception_count': 3, 'log_count/ERROR': 3},
+    {},
+])
+def test_empty_or_failed_crawl_is_not_marked_done(processor, tmp_path, stats):
+    stub_crawl(processor, [], stats)
+    assert processor.run() is False
+    date = processor.checkpoint.date
+    assert processor.checkpoint.state() == {'crawled': False, 'completed': False, 'date': date}
+
+    # --resume 会重新爬取，而不是认为当天已经处理完
+    assert processor.run(resume=True) is False
+    assert processor.crawls == 2
+
+
+def test_failed_crawl_keeps_published_files(processor, tmp_path):
+    stub_crawl(processor, [], {'downloader/exception_count': 1})
+    processor.run()
+    date = processor.checkpoint.date
+    (tmp_path / f"{date}.jsonl").write_text('{"id": "old"}\n', encoding='utf-8')
+    processor.run()
+    assert published(tmp_path, date) == '{"id": "old"}\n'
+
+
+def test_successful_crawl_publishes_and_completes(processor, tmp_path):
+    item = {'id': '2507.00001', 'title': 'A title', 'summary': 'A summary', 'categories': ['cs.CV'],
+            'AI': {'tldr': 'done'}}
+    stub_crawl(processor, [item], {'log_count/ERROR': 1})
+    assert processor.run() is True
+    date = processor.checkpoint.date
+    assert processor.checkpoint.state()['completed'] is True
+    assert [json.loads(line)['id'] for line in published(tmp_path, date).splitlines()] == [item['id']]
+    assert not os.path.exists(processor.checkpoint.crawl_checkpoint)
+
+    assert processor.run(resume=True) is True
+    assert processor.crawls == 1
@@ -0,0 +1,139 @@
+import json
+import os
+
+import pytest
+
+from api.storage import INDEX_VERSION, JsonlIndex, JsonlStore
+
+DATE = '2025-07-01'
+
+
+def line(paper_id, title='A title', categories=('cs.CV',)):
+    return json.dumps({'id': paper_id, 'title': title, 'summary': 'A summary',
+                       'categories': list(categories)}) + '\n'
+
+
+def write(path, text, mode='w'):
+    with open(path, mode, encoding='utf-8') as f:
+        f.write(text)
+
+
+def sidecar(path):
+    with open(str(path) + '.idx', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def day_file(tmp_path):
+    path = tmp_path / f'{DATE}.jsonl'
+    write(path, line('a') + line('b', categories=('cs.CL',)))
+    return path
+
+
+def titles(index):
+    return {paper_id: index.read(paper_id)[0]['title'] for paper_id in index.ids()}
+
+
+def test_builds_index_and_sidecar(day_file):
+    index = JsonlIndex(str(day_file))
+    index.refresh()
+    assert index.ids() == ['a', 'b']
+    assert index.ids('cs.CL') == ['b']
+    data = sidecar(day_file)
+    assert data['version'] == INDEX_VERSION
+    assert data['size'] == os.path.getsize(day_file)
+    assert data['inode'] == os.stat(day_file).st_ino
+
+
+def test_sidecar_is_reused_without_rescanning(day_file, monkeypatch):
+    JsonlIndex(str(day_file)).refresh()
+    scans = []
+    monkeypatch.setattr(JsonlIndex, '_scan', lambda self, mtime: scans.append(self.size))
+    index = JsonlIndex(str(day_file))
+    index.refresh()
+    assert scans == []
+    assert titles(index) == {'a': 'A title', 'b': 'A title'}
+
+
+def test_appended_lines_are_indexed_incrementally(day_file):
+    index = JsonlIndex(str(day_file))
+    index.refresh()
+    size = index.size
+    write(day_file, line('c') + line('a', title='New title'), 'a')
+    index.refresh()
+    assert index.ids() == ['a', 'b', 'c']
+    # 同一 id 以最后一行为准
+    assert titles(index)['a'] == 'New title'
+    assert index.records['c'][0] == size
+    assert sidecar(day_file)['size'] == os.path.getsize(day_file)
+    assert set(JsonlIndex(str(day_file)).records) == {'a', 'b', 'c'}
+
+
+def test_incomplete_last_line_waits_until_written(day_file):
+    index = JsonlIndex(str(day_file))
+    index.refresh()
+    text = line('c')
+    write(day_file, text[:10], 'a')
+    index.refresh()
+    assert index.ids() == ['a', 'b']
+    write(day_file, text[10:], 'a')
+    index.refresh()
+    assert index.ids() == ['a', 'b', 'c']
+
+
+def test_shrunk_file_is_reindexed(day_file):
+    index = JsonlIndex(str(day_file))
+    index.refresh()
+    inode = os.stat(day_file).st_ino
+    write(day_file, line('z'))
+    assert os.stat(day_file).st_ino == inode
+    index.refresh()
+    assert index.ids() == ['z']
+    # 重新打开时旧的索引文件也已更新
+    assert list(JsonlIndex(str(day_file)).records) == ['z']
+
+
+def test_replaced_file_is_reindexed(day_file, tmp_path):
+    index = JsonlIndex(str(day_file))
+    index.refresh()
+    replacement = tmp_path / 'new.jsonl'
+    write(replacement, line('x') + line('y') + line('w'))
+    os.replace(replacement, day_file)
+    index.refresh()
+    assert index.ids() == ['x', 'y', 'w']
+
+
+def test_mismatched_offsets_are_detected_on_read(day_file):
+    JsonlIndex(str(day_file)).refresh()
+    # 原地重写并追加到比索引更大，大小和 inode 都无法发现偏移已失效
+    write(day_file, line('bb', title='Other') + line('aa') + line('c'))
+    data = sidecar(day_file)
+    data['size'] = os.path.getsize(day_file)
+    write(str(day_file) + '.idx', json.dumps(data))
+    index = JsonlIndex(str(day_file))
+    index.refresh()
+    assert index.read('a') is None
+    assert titles(index) == {'bb': 'Other', 'aa': 'A title', 'c': 'A title'}
+
+
+def test_stale_or_corrupt_sidecar_is_ignored(day_file):
+    write(str(day_file) + '.idx', json.dumps({'version': INDEX_VERSION - 1, 'records': {'q': [0, 1, 0]}}))
+    index = JsonlIndex(str(day_file))
+    index.refresh()
+    assert index.ids() == ['a', 'b']
+    write(str(day_file) + '.idx', '{not json')
+    index = JsonlIndex(str(day_file))
+    index.refresh()
+    assert index.ids() == ['a', 'b']
+
+
+def test_store_prefers_enhanced_records(day_file, tmp_path):
+    enhanced = line('b', title='Enhanced', categories=('cs.CL',))
+    write(tmp_path / f'{DATE}_AI_enhanced_Chinese.jsonl', enhanced)
+    store = JsonlStore(str(tmp_path), 'Chinese')
+    papers = store.get_papers_between(DATE, DATE)
+    assert [(p['id'], p['title']) for p in papers] == [('a', 'A title'), ('b', 'Enhanced')]
+    assert [p['id'] for p in store.get_papers_between(DATE, DATE, 'cs.CL')] == ['b']
+    assert [p['id'] for p in store.iter_papers_between(DATE, DATE, oldest_first=True)] == ['b', 'a']
+    count, updated = store.papers_version(DATE, DATE)
+    assert count == 2 and updated is not None
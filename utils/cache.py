@@ -1,15 +1,113 @@
-from typing import Optional
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+def estimate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """粗略估算对象占用的字节数，递归计入容器中的元素，共享对象只计一次。"""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k, _seen) + estimate_size(v, _seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for v in value:
+            size += estimate_size(v, _seen)
+    elif hasattr(value, '__dict__'):
+        size += estimate_size(vars(value), _seen)
+    return size
 
 class Cache:
-    def __init__(self):
-        self._cache = {}
+    """线程安全的内存缓存，支持 LRU 淘汰和按键设置的 TTL。
+
+    容量同时受条目数和估算字节数约束，超出任一上限时淘汰最久未使用的条目。
+    """
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 default_ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # key -> (value, expires_at, size)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, data: Any, ttl: Optional[float] = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        size = estimate_size(data)
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            # 单个条目超过总字节上限时不缓存
+            if size > self.max_bytes:
+                return
+            self._cache[key] = (data, expires_at, size)
+            self._bytes += size
+            while len(self._cache) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._cache))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
 
-    def get(self, date_str: str) -> Optional[list]:
-        key = date_str
-        return self._cache.get(key)
+    def __len__(self):
+        return len(self._cache)
 
-    def set(self, date_str: str, data: list):
-        key = date_str
-        self._cache[key] = data
+    def _remove(self, key: Hashable):
+        _, _, size = self._cache.pop(key)
+        self._bytes -= size
 
-memory_cache = Cache() 
\ No newline at end of file
+memory_cache = Cache(
+    max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', '512')),
+    max_bytes=int(os.environ.get('CACHE_MAX_MB', '128')) * 1024 * 1024,
+)
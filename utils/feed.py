@@ -0,0 +1,172 @@
+import os
+import re
+import gzip
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Iterable, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只提供 gzip
+    brotli = None
+
+# 每次缓存未命中都会同步压缩整份RSS，默认等级在压缩率几乎不变的前提下控制耗时
+FEED_GZIP_LEVEL = int(os.environ.get('FEED_GZIP_LEVEL', '6'))
+FEED_BROTLI_QUALITY = int(os.environ.get('FEED_BROTLI_QUALITY', '5'))
+
+# 片段渲染规则变化时递增，数据库中旧版本的片段会被忽略并重新渲染
+FRAGMENT_VERSION = 2
+
+# XML 1.0 不允许出现的控制字符
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+# 同等权重时优先选择压缩率更高的编码
+ENCODING_PREFERENCE = ('br', 'gzip')
+
+def compress_variants(body: bytes) -> dict:
+    """为RSS正文一次性生成各压缩版本，返回 {编码: 压缩后字节}。"""
+    # mtime=0 保证相同输入得到相同输出
+    variants = {'gzip': gzip.compress(body, compresslevel=FEED_GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=FEED_BROTLI_QUALITY)
+    return variants
+
+def choose_encoding(accept_encoding: Optional[str], available) -> Optional[str]:
+    """按 Accept-Encoding 选出可用的压缩编码，返回 None 表示发送未压缩内容。"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODING_PREFERENCE:
+        if encoding not in available:
+            continue
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def build_description(item):
+    # Extract data
+    ai = item.get('AI', {})
+    title = str(item.get('title', 'Untitled'))
+
+    authors_list = item.get('authors')
+    authors = '; '.join(str(a) for a in authors_list) if authors_list else 'Anonymous'
+
+    categories_list = item.get('categories')
+    categories = ' | '.join(str(c) for c in categories_list) if categories_list else ''
+    
+    # Build description with simple tags
+    description = [
+        f"<b>Title:</b> &nbsp;{title}<br>",
+        f"<b>Authors:</b>&nbsp; {authors}<br>",
+        f"<b>Categories:</b> &nbsp;{categories}<br>" if categories else "",
+    ]
+    # 尚未完成AI增强的论文只展示标题和摘要
+    if any(v not in (None, '') for v in ai.values()):
+        description.extend([
+            "<br>",
+            "<b>Research Motivation:</b>&nbsp;",
+            str(ai.get('motivation', 'Not provided')) + "<br>",
+            "<br>",
+            "<b>Methodology:</b>&nbsp;",
+            str(ai.get('method', 'Not described')) + "<br>",
+            "<br>",
+            "<b>Key Results:</b>&nbsp;",
+            str(ai.get('result', 'Not available')) + "<br>",
+            "<br>",
+            "<b>Conclusions:</b>&nbsp;",
+            str(ai.get('conclusion', 'None drawn')) + "<br>",
+        ])
+    description.extend([
+        "<br>",
+        "<b>Abstract:</b>&nbsp;",
+        str(item.get('summary', 'No abstract available')) + "<br>"
+    ])
+    
+    # Add comment if exists
+    comment_text = item.get('comment')
+    if comment_text is not None:
+        description.extend([
+            "<br>",
+            "<b>Editorial Note:</b>&nbsp;",
+            str(comment_text) + "<br>"
+        ])
+    
+    pdf_url = str(item.get('pdf', ''))
+    if pdf_url:
+        description.extend([
+            "<br>",
+            "<b>Resources:</b>&nbsp;",
+            f'<a href="{pdf_url}">PDF</a>'
+        ])
+    
+    # Join and remove empty lines
+    return ''.join(filter(None, description))
+
+def _text(value) -> str:
+    return escape(_INVALID_XML_CHARS.sub('', str(value)))
+
+def render_item_fragment(item: dict) -> Optional[str]:
+    """将单篇论文渲染为RSS的 <item> XML 片段，没有标题的论文返回 None。"""
+    title = item.get('title')
+    if not title:
+        return None
+    ai = item.get('AI') or {}
+    zh = ai.get('tldr')
+    if not zh:
+        # 未增强的论文（AI字段全部为空）直接使用原标题
+        zh = '\n'.join([f"{k}: {v}" for k, v in ai.items() if v not in (None, '')])
+    parts = [
+        '<item>',
+        f'<title>{_text(zh if zh else title)}</title>',
+        f"<link>{_text(item.get('abs', ''))}</link>",
+        f'<description>{_text(build_description(item))}</description>',
+        f"<guid isPermaLink=\"false\">{_text(item.get('id', ''))}</guid>",
+    ]
+    if isinstance(item.get('categories'), list):
+        for c in item['categories']:
+            parts.append(f'<category>{_text(c)}</category>')
+    published_date = item.get('updated_at')
+    if isinstance(published_date, datetime):
+        parts.append(f'<pubDate>{format_datetime(published_date.astimezone(timezone.utc))}</pubDate>')
+    parts.append('</item>')
+    return ''.join(parts)
+
+def feed_header(title: str, link: str, description: str, last_build: datetime, pretty: bool = True) -> str:
+    sep = '\n' if pretty else ''
+    return sep.join([
+        "<?xml version='1.0' encoding='UTF-8'?>",
+        '<rss xmlns:atom="http://www.w3.org/2005/Atom" xmlns:content="http://purl.org/rss/1.0/modules/content/" version="2.0">',
+        '<channel>',
+        f'<title>{_text(title)}</title>',
+        f'<link>{_text(link)}</link>',
+        f'<description>{_text(description)}</description>',
+        f'<atom:link href={quoteattr(link)} rel="self"/>',
+        '<docs>http://www.rssboard.org/rss-specification</docs>',
+        '<generator>daily-arXiv-ai-enhanced</generator>',
+        f'<lastBuildDate>{format_datetime(last_build.astimezone(timezone.utc))}</lastBuildDate>',
+    ]) + sep
+
+def feed_footer(pretty: bool = True) -> str:
+    return '</channel>\n</rss>\n' if pretty else '</channel></rss>'
+
+def assemble_feed(header: str, fragments: Iterable[str], pretty: bool = True) -> bytes:
+    """拼接频道头、条目片段和结尾，得到完整的RSS文档。"""
+    sep = '\n' if pretty else ''
+    body = sep.join(f for f in fragments if f)
+    return (header + body + sep + feed_footer(pretty)).encode('utf-8')
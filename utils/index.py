@@ -0,0 +1,158 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Iterable, Optional
+
+_TOKEN_RE = re.compile(r'\w+')
+# 短于该长度、或不含任何字母数字的关键字会命中几乎所有论文，直接拒绝
+MIN_KEYWORD_LENGTH = 2
+
+def tokenize(text: Optional[str]) -> list:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+def normalize_text(text: Optional[str]) -> str:
+    """小写并按词切分后用单个空格连接，用于短语匹配。"""
+    return ' '.join(tokenize(text))
+
+def paper_text(item: dict) -> str:
+    return f"{item.get('title') or ''} {item.get('summary') or ''}"
+
+def is_valid_keyword(keyword: str) -> bool:
+    keyword = keyword.strip()
+    return len(keyword) >= MIN_KEYWORD_LENGTH and _TOKEN_RE.search(keyword) is not None
+
+def is_literal(keyword: str) -> bool:
+    """按词切分会丢失含义的关键字（如 c++、3.5、gpt-4 中的单字符词）按原文做子串匹配。"""
+    return any(len(token) < MIN_KEYWORD_LENGTH for token in tokenize(keyword))
+
+def phrase_matches(normalized_text: str, normalized_keyword: str) -> bool:
+    # 与原先的子串语义一致：former 可以匹配 transformer，短语内的词之间忽略标点和空白的差异
+    return normalized_keyword in normalized_text
+
+def matches_keywords(item: dict, keywords: Iterable[str]) -> bool:
+    """不借助索引判断论文的标题或摘要是否命中任一关键字，语义与 KeywordIndex.search 一致。"""
+    raw = paper_text(item).lower()
+    text = normalize_text(raw)
+    for keyword in keywords:
+        if not is_valid_keyword(keyword):
+            continue
+        if is_literal(keyword):
+            if keyword.lower() in raw:
+                return True
+        elif phrase_matches(text, normalize_text(keyword)):
+            return True
+    return False
+
+class KeywordIndex:
+    """标题和摘要上的倒排索引，关键字查询通过倒排表的交集、并集完成。"""
+    def __init__(self):
+        self._postings = defaultdict(set)  # 词 -> 论文 id 集合
+        self._texts = {}  # 论文 id -> 归一化文本，用于校验短语
+        self._raw = {}  # 论文 id -> 小写原文，用于按原文匹配的关键字
+        self._vocabulary = None  # 有序词表，前缀查询时按需重建
+
+    def add(self, doc_id: str, text: str):
+        tokens = tokenize(text)
+        self._texts[doc_id] = ' '.join(tokens)
+        self._raw[doc_id] = text.lower()
+        for token in tokens:
+            self._postings[token].add(doc_id)
+        self._vocabulary = None
+
+    def __len__(self):
+        return len(self._texts)
+
+    def _words(self) -> list:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        return self._vocabulary
+
+    def _prefix_postings(self, prefix: str) -> set:
+        vocabulary = self._words()
+        result = set()
+        i = bisect_left(vocabulary, prefix)
+        while i < len(vocabulary) and vocabulary[i].startswith(prefix):
+            result |= self._postings[vocabulary[i]]
+            i += 1
+        return result
+
+    def _matching_postings(self, match) -> set:
+        # 子串、后缀匹配无法利用有序词表，直接扫描词表（单日词表只有数万个词）
+        result = set()
+        for word in self._words():
+            if match(word):
+                result |= self._postings[word]
+        return result
+
+    def search_phrase(self, keyword: str) -> set:
+        if not is_valid_keyword(keyword):
+            return set()
+        if is_literal(keyword):
+            keyword = keyword.lower()
+            return {doc_id for doc_id, raw in self._raw.items() if keyword in raw}
+        tokens = tokenize(keyword)
+        if len(tokens) == 1:
+            return self._matching_postings(lambda word: tokens[0] in word)
+        # 第一个词可以是某个词的后缀，中间的词必须完全相同，最后一个词可以是前缀；从最短的倒排表开始求交集
+        postings = [self._postings.get(t, set()) for t in tokens[1:-1]]
+        postings.append(self._prefix_postings(tokens[-1]))
+        candidates = None
+        for posting in sorted(postings, key=len):
+            candidates = set(posting) if candidates is None else candidates & posting
+            if not candidates:
+                return set()
+        candidates &= self._matching_postings(lambda word: word.endswith(tokens[0]))
+        phrase = ' '.join(tokens)
+        return {doc_id for doc_id in candidates if phrase_matches(self._texts[doc_id], phrase)}
+
+    def search(self, keywords: Iterable[str]) -> set:
+        """返回命中任一关键字的论文 id 集合。"""
+        result = set()
+        for keyword in keywords:
+            result |= self.search_phrase(keyword)
+        return result
+
+class DayIndex:
+    """某一天论文的内存视图，整体放入缓存。
+
+    包含条目列表、按分类分桶的条目（与 items 共享同一批对象）以及关键字索引。
+    categories 不为空时只为这些分类建桶。
+    """
+    def __init__(self, date_str: str, items: list, categories: Optional[Iterable[str]] = None):
+        self.date = date_str
+        self.items = items
+        self.by_category = defaultdict(list)
+        self.keywords = KeywordIndex()
+        wanted = set(categories) if categories else None
+        for item in items:
+            if item.get('id'):
+                self.keywords.add(item['id'], paper_text(item))
+            cats = item.get('categories')
+            if isinstance(cats, list):
+                for cat in dict.fromkeys(cats):
+                    if wanted is None or cat in wanted:
+                        self.by_category[cat].append(item)
+        self.by_category = dict(self.by_category)
+
+    def items_for(self, category: Optional[str] = None) -> list:
+        if category is None:
+            return self.items
+        return self.by_category.get(category, [])
+
+def _like_escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def keyword_like_patterns(keywords: Iterable[str]) -> Optional[list]:
+    """把关键字转换为数据库端预过滤用的 LIKE 模式，作用于小写的“标题 摘要”文本。
+
+    返回 [[模式, ...], ...]：同一关键字的模式之间取交集，不同关键字之间取并集。
+    短语关键字的每个词都必须作为子串出现，按原文匹配的关键字使用原文本身，
+    因此预过滤的结果总是包含 matches_keywords 命中的全部论文。
+    """
+    clauses = []
+    for keyword in keywords:
+        if not is_valid_keyword(keyword):
+            continue
+        parts = [keyword.lower()] if is_literal(keyword) else tokenize(keyword)
+        clauses.append([f"%{_like_escape(part)}%" for part in parts])
+    return clauses or None
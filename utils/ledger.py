@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+# 单个条目在某阶段最多尝试的次数，达到后标记为 failed，不再自动重试
+LEDGER_MAX_ATTEMPTS = int(os.environ.get('LEDGER_MAX_ATTEMPTS', '5'))
+# 失败后的重试间隔（秒）按 base * 2^(n-1) 增长，不超过 max
+LEDGER_BACKOFF_BASE = float(os.environ.get('LEDGER_BACKOFF_BASE', '600'))
+LEDGER_BACKOFF_MAX = float(os.environ.get('LEDGER_BACKOFF_MAX', '86400'))
+
+PENDING = 'pending'
+OK = 'ok'
+FAILED = 'failed'
+
+class Ledger:
+    """按 (阶段, 条目) 记录处理结果的失败台账。
+
+    各阶段处理前用 due() 过滤掉已放弃或尚未到重试时间的条目，处理后用
+    mark_ok()/mark_failed() 记录结果。配置了 DATABASE_URL 时存放在 item_status 表中，
+    否则使用本地 SQLite 文件（LEDGER_PATH）。
+    """
+    def __init__(self, stage: str, db_manager=None, path: Optional[str] = None,
+                 max_attempts: int = LEDGER_MAX_ATTEMPTS, backoff_base: float = LEDGER_BACKOFF_BASE,
+                 backoff_max: float = LEDGER_BACKOFF_MAX):
+        if db_manager is None:
+            from api.database import DatabaseManager
+            db_manager = DatabaseManager()
+        self.logger = logging.getLogger(__name__)
+        self.stage = stage
+        self.db_manager = db_manager
+        self.path = None
+        if not self.db_manager.conn_string:
+            self.path = path or os.environ.get(
+                'LEDGER_PATH', os.path.join(os.environ.get('DATA_DIR', 'data'), 'ledger.sqlite3'))
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.skipped = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.given_up = 0
+
+    def _sqlite(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS item_status (
+                stage TEXT NOT NULL, item_id TEXT NOT NULL, status TEXT NOT NULL,
+                attempts INT NOT NULL DEFAULT 0, last_error TEXT, next_retry_at TEXT,
+                PRIMARY KEY (stage, item_id)
+            )
+        """)
+        return conn
+
+    def statuses(self, item_ids: list) -> dict:
+        """返回 {item_id: (status, attempts, last_error, next_retry_at)}，没有记录的条目不在结果中。"""
+        item_ids = list(dict.fromkeys(item_ids))
+        if not item_ids:
+            return {}
+        if self.path is None:
+            return self.db_manager.get_item_status(self.stage, item_ids)
+        found = {}
+        with self._sqlite() as conn:
+            for i in range(0, len(item_ids), 500):
+                chunk = item_ids[i:i + 500]
+                rows = conn.execute(
+                    "SELECT item_id, status, attempts, last_error, next_retry_at FROM item_status "
+                    f"WHERE stage = ? AND item_id IN ({','.join('?' * len(chunk))})",
+                    [self.stage, *chunk]).fetchall()
+                for item_id, status, attempts, last_error, next_retry_at in rows:
+                    retry_at = datetime.fromisoformat(next_retry_at) if next_retry_at else None
+                    found[item_id] = (status, attempts, last_error, retry_at)
+        conn.close()
+        return found
+
+    def _write(self, rows: list):
+        if not rows:
+            return
+        if self.path is None:
+            self.db_manager.put_item_status(self.stage, rows)
+            return
+        with self._sqlite() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO item_status (stage, item_id, status, attempts, last_error, next_retry_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.stage, item_id, status, attempts, error, retry_at.isoformat() if retry_at else None)
+                 for item_id, status, attempts, error, retry_at in rows])
+        conn.close()
+
+    def due(self, item_ids: list) -> list:
+        """返回本次应当处理的条目（保持原顺序）：跳过已放弃的和尚未到重试时间的条目。"""
+        records = self.statuses(item_ids)
+        now = datetime.now(timezone.utc)
+        result = []
+        for item_id in item_ids:
+            record = records.get(item_id)
+            if record is not None:
+                status, _, _, retry_at = record
+                if status == FAILED or (status == PENDING and retry_at is not None and retry_at > now):
+                    self.skipped += 1
+                    continue
+            result.append(item_id)
+        return result
+
+    def abandoned(self, item_ids: list) -> set:
+        """返回已放弃的条目：标记为 failed 或失败次数已达到上限，不会再被自动重试。"""
+        return {item_id for item_id, (status, attempts, _, _) in self.statuses(item_ids).items()
+                if status == FAILED or attempts >= self.max_attempts}
+
+    def backoff(self, attempts: int) -> float:
+        return min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+
+    def mark_ok(self, item_ids: list):
+        item_ids = list(dict.fromkeys(item_ids))
+        records = self.statuses(item_ids)
+        self._write([(item_id, OK, records.get(item_id, (None, 0))[1], None, None) for item_id in item_ids])
+        self.succeeded += len(item_ids)
+
+    def mark_failed(self, errors: dict) -> list:
+        """记录失败，errors 为 {item_id: 错误信息}；返回本次达到上限而放弃的条目。"""
+        records = self.statuses(list(errors))
+        now = datetime.now(timezone.utc)
+        rows, given_up = [], []
+        for item_id, error in errors.items():
+            attempts = records.get(item_id, (None, 0))[1] + 1
+            if attempts >= self.max_attempts:
+                rows.append((item_id, FAILED, attempts, str(error), None))
+                given_up.append(item_id)
+            else:
+                rows.append((item_id, PENDING, attempts, str(error), now + timedelta(seconds=self.backoff(attempts))))
+        self._write(rows)
+        self.failed += len(errors)
+        self.given_up += len(given_up)
+        if given_up:
+            self.logger.warning(f"[{self.stage}] {len(given_up)} 个条目已失败 {self.max_attempts} 次，不再重试: {given_up[:10]}")
+        return given_up
+
+    def summary(self) -> str:
+        return (f"[{self.stage}] 成功 {self.succeeded}，失败 {self.failed}（其中放弃 {self.given_up}），"
+                f"跳过 {self.skipped}")